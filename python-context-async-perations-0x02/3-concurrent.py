@@ -1,15 +1,29 @@
+import os
+import sys
 import asyncio
-import aiosqlite
+
+# The decorators live in the sibling python-decorators-0x01 project
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                "..", "python-decorators-0x01"))
+log_queries = __import__('0-log_queries').log_queries
+with_db_connection = __import__('1-with_db_connection').with_db_connection
+retry_on_failure = __import__('3-retry_on_failure').retry_on_failure
+cache_query = __import__('4-cache_query').cache_query
+
+
+@log_queries
+@with_db_connection
+@retry_on_failure(retries=3, delay=0.1)
+@cache_query
+async def fetch_users(conn, query, params=()):
+    async with conn.execute(query, params) as cursor:
+        return await cursor.fetchall()
 
 async def async_fetch_users():
-    async with aiosqlite.connect("users.db") as db:
-        async with db.execute("SELECT * FROM users") as cursor:
-            return await cursor.fetchall()
+    return await fetch_users(query="SELECT * FROM users")
 
 async def async_fetch_older_users():
-    async with aiosqlite.connect("users.db") as db:
-        async with db.execute("SELECT * FROM users WHERE age > 40") as cursor:
-            return await cursor.fetchall()
+    return await fetch_users(query="SELECT * FROM users WHERE age > ?", params=(40,))
 
 async def fetch_concurrently():
     users, older_users = await asyncio.gather(
@@ -2,31 +2,209 @@
 """
 A script that demonstrates logging SQL queries with timestamps
 using a Python decorator.
+
+Query records are structured (fingerprint, parameters, latency, row count
+and thread id) and are written by a background QueueListener, so the
+decorated call only pays for a queue put; the LogRecord itself is built
+on the writer thread.
 """
 
+import re
+import sys
+import time
+import queue
+import atexit
+import random
+import inspect
+import logging
 import sqlite3
 import functools
-from datetime import datetime  # used to add timestamps to logs
+import threading
+from logging.handlers import QueueHandler, QueueListener
 
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_SPACES = re.compile(r"\s+")
+
+logger = logging.getLogger("queries")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+_queue = queue.SimpleQueue()
+_listener = None
+_listener_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=1024)
+def fingerprint(query):
+    """
+    Normalise a query so that calls differing only in literal values
+    group together: comments dropped, whitespace collapsed, string and
+    number literals replaced by ? and IN lists reduced to IN (?).
+    """
+    if not query:
+        return None
+    text = _COMMENTS.sub(" ", query)
+    text = _LITERALS.sub("?", text)
+    text = _IN_LIST.sub("IN (?)", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+class _QueryListener(QueueListener):
+    """
+    QueueListener fed with raw (created, info) tuples by log_queries; the
+    LogRecord is only built here, on the writer thread. Ordinary records
+    from the queries logger pass through unchanged.
+    """
+
+    def dequeue(self, block):
+        item = self.queue.get(block)
+        if type(item) is tuple:
+            created, info = item
+            item = logging.makeLogRecord({
+                "name": logger.name, "levelno": logging.INFO,
+                "levelname": "INFO", "msg": "query", "created": created,
+                "msecs": (created % 1) * 1000, "thread": info["thread"],
+                "query": info})
+        return item
+
+
+class QueryFormatter(logging.Formatter):
+    """Render a query record as one timestamped line."""
+
+    def __init__(self):
+        super().__init__("[%(asctime)s] %(message)s", "%Y-%m-%d %H:%M:%S")
+
+    def format(self, record):
+        info = getattr(record, "query", None)
+        if info is not None:
+            label = "Slow SQL Query" if info["slow"] else "Executing SQL Query"
+            record.msg = (label + ": {fingerprint} params={params} "
+                          "latency_ms={latency_ms:.3f} rows={rowcount} "
+                          "thread={thread}").format(**info)
+            if info["error"]:
+                record.msg += f" error={info['error']}"
+            record.args = None
+        return super().format(record)
 
-def log_queries(func):
-    """Decorator that logs SQL queries before executing them."""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        # Retrieve the SQL query argument
-        query = kwargs.get('query') or (args[0] if args else None)
 
-        # Add timestamp for logging
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+def start_logging(handler=None):
+    """
+    Start the background writer (idempotent). By default it writes to
+    stdout; pass any logging.Handler to send records elsewhere.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is not None:
+            return _listener
+        if handler is None:
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(QueryFormatter())
+        logger.addHandler(QueueHandler(_queue))
+        _listener = _QueryListener(_queue, handler, respect_handler_level=True)
+        _listener.start()
+        return _listener
 
-        # Log the query
-        if query:
-            print(f"[{timestamp}] Executing SQL Query: {query}")
-        else:
-            print(f"[{timestamp}] No SQL query provided.")
 
-        # Execute the original function
-        return func(*args, **kwargs)
+def stop_logging():
+    """Flush pending records and stop the background writer."""
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        for handler in list(logger.handlers):
+            if isinstance(handler, QueueHandler):
+                logger.removeHandler(handler)
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+def _query_and_params(args, kwargs):
+    """The SQL string a call runs and its parameters; (None, ...) if none."""
+    query = kwargs.get('query')
+    rest = ()
+    if query is None:
+        for index, arg in enumerate(args):
+            if isinstance(arg, str):
+                query, rest = arg, args[index + 1:]
+                break
+    if not isinstance(query, str):
+        query = None
+    params = kwargs.get('params', rest[0] if rest else ())
+    return query, params
+
+
+def log_queries(func=None, *, sample_rate=1.0, slow_ms=None):
+    """
+    Decorator that logs SQL queries with their latency and row count.
+
+    Usable bare (@log_queries) or configured. sample_rate keeps that
+    fraction of ordinary queries; queries slower than slow_ms and failing
+    queries are always logged. With slow_ms set and sample_rate=0 only
+    slow queries are logged. Coroutine functions are timed across the await.
+    """
+    if func is None:
+        return functools.partial(log_queries, sample_rate=sample_rate,
+                                 slow_ms=slow_ms)
+
+    def record(args, kwargs, rows, error, start):
+        latency_ms = (time.perf_counter() - start) * 1000
+        slow = slow_ms is not None and latency_ms >= slow_ms
+        if error or slow or (sample_rate >= 1.0 or random.random() < sample_rate):
+            query, params = _query_and_params(args, kwargs)
+            _queue.put((time.time(), {
+                "fingerprint": fingerprint(query) if query else f"{func.__qualname__}()",
+                "params": params,
+                "latency_ms": latency_ms,
+                "rowcount": len(rows) if isinstance(rows, (list, tuple)) else None,
+                "thread": threading.get_ident(),
+                "slow": slow,
+                "error": error,
+            }))
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            if not logger.isEnabledFor(logging.INFO):
+                return await func(*args, **kwargs)
+            if _listener is None:
+                start_logging()
+
+            error = None
+            rows = None
+            start = time.perf_counter()
+            try:
+                rows = await func(*args, **kwargs)
+                return rows
+            except Exception as e:
+                error = repr(e)
+                raise
+            finally:
+                record(args, kwargs, rows, error, start)
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not logger.isEnabledFor(logging.INFO):
+            return func(*args, **kwargs)
+        if _listener is None:
+            start_logging()
+
+        error = None
+        rows = None
+        start = time.perf_counter()
+        try:
+            rows = func(*args, **kwargs)
+            return rows
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            record(args, kwargs, rows, error, start)
     return wrapper
 
 
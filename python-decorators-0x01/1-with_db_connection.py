@@ -2,26 +2,176 @@
 """
 Decorator that automatically manages opening and closing
 database connections with timestamped logging.
+
+Connections come from a shared, thread-safe pool so that short queries
+do not pay for connect/teardown and schema parsing on every call.
+Coroutine functions get an aiosqlite connection instead.
 """
 
+import time
+import inspect
 import sqlite3
 import functools
+import threading
+from contextlib import contextmanager
 from datetime import datetime  # for timestamped logging
 
 
+class PoolTimeout(Exception):
+    """No pooled connection became available in time."""
+
+
+class SQLitePool:
+    """
+    Thread-safe pool of SQLite connections.
+
+    Connections are opened in WAL mode with a statement cache of
+    cached_statements prepared statements, health-checked on checkout and
+    closed after idle_timeout idle seconds. At most max_size connections
+    exist at once; acquire() waits up to checkout_timeout for one.
+    """
+
+    def __init__(self, database='users.db', max_size=5, idle_timeout=60,
+                 checkout_timeout=30, cached_statements=256):
+        self.database = database
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.cached_statements = cached_statements
+        self._idle = []  # (connection, released_at), most recent last
+        self._open = 0
+        self._cond = threading.Condition()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.database, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _discard(self, conn):
+        self._open -= 1
+        conn.close()
+
+    @staticmethod
+    def _healthy(conn):
+        try:
+            conn.execute("SELECT 1")
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._idle and now - self._idle[0][1] > self.idle_timeout:
+                    self._discard(self._idle.pop(0)[0])
+                while self._idle:
+                    conn, _ = self._idle.pop()
+                    if self._healthy(conn):
+                        return conn
+                    self._discard(conn)
+                if self._open < self.max_size:
+                    self._open += 1
+                    break
+                if not self._cond.wait(deadline - now) and time.monotonic() >= deadline:
+                    raise PoolTimeout(
+                        f"No connection available within {self.checkout_timeout}s")
+        try:
+            return self._connect()
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn):
+        with self._cond:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()  # never hand out an open transaction
+            except sqlite3.Error:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        with self._cond:
+            for conn, _ in self._idle:
+                self._discard(conn)
+            self._idle = []
+
+
+pool = SQLitePool()  # shared by every decorator in this project
+_local = threading.local()
+
+
+def bound_connection():
+    """The connection bound to this thread by bind_connection(), if any."""
+    return getattr(_local, "conn", None)
+
+
+@contextmanager
+def bind_connection(conn=None):
+    """
+    Make with_db_connection hand conn (default: one borrowed from the pool)
+    to every decorated call on this thread until the block exits.
+    """
+    borrowed = conn is None
+    if borrowed:
+        conn = pool.acquire()
+    previous = bound_connection()
+    _local.conn = conn
+    try:
+        yield conn
+    finally:
+        _local.conn = previous
+        if borrowed:
+            pool.release(conn)
+
+
 def with_db_connection(func):
-    """Decorator to handle opening and closing DB connections."""
+    """
+    Decorator to borrow a DB connection from the shared pool.
+
+    For an async def the wrapper is a coroutine function that opens an
+    aiosqlite connection to the pool's database for the call. These are
+    not pooled: each aiosqlite connection runs a non-daemon worker
+    thread, so idle ones would keep the interpreter from exiting.
+    """
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            import aiosqlite
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            print(f"[{timestamp}] Opening database connection.")
+            async with aiosqlite.connect(pool.database) as conn:
+                result = await func(conn, *args, **kwargs)
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Closed database connection.")
+            return result
+        return async_wrapper
+
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        conn = bound_connection()
+        if conn is not None:
+            return func(conn, *args, **kwargs)
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"[{timestamp}] Opening database connection.")
-        conn = sqlite3.connect('users.db')
-        try:
+        with pool.connection() as conn:
             result = func(conn, *args, **kwargs)
-            return result
-        finally:
-            conn.close()
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Closed database connection.")
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Closed database connection.")
+        return result
     return wrapper
 
 
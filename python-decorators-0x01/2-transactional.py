@@ -2,44 +2,245 @@
 """
 Decorator that manages database transactions by automatically
 committing or rolling back with timestamped logging.
+
+Inside transaction_batch() many decorated calls share one transaction that
+is committed every max_calls calls or max_seconds seconds, trading one
+commit (and fsync) per call for one per batch.
 """
 
-import sqlite3
+import re
+import time
+import inspect
+import weakref
 import functools
+import threading
+from contextlib import contextmanager
 from datetime import datetime  # for logging timestamps
 
+db_connection = __import__('1-with_db_connection')
+with_db_connection = db_connection.with_db_connection
 
-def with_db_connection(func):
-    """Decorator to open and close a DB connection automatically."""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] Opening database connection.")
-        conn = sqlite3.connect('users.db')
+ALL_TABLES = "*"  # stands for every table when a statement can't be parsed
+# A possibly schema-qualified, possibly quoted name; group 1 is the table
+TABLE_NAME = r"(?:[`\"\[]?\w+[`\"\]]?\s*\.\s*)?[`\"\[]?(\w+)[`\"\]]?"
+WRITE_PATTERN = re.compile(
+    r"^\s*(?:INSERT(?:\s+OR\s+\w+)?\s+INTO|REPLACE\s+INTO|UPDATE(?:\s+OR\s+\w+)?"
+    r"|DELETE\s+FROM|DROP\s+TABLE(?:\s+IF\s+EXISTS)?|ALTER\s+TABLE)"
+    r"\s+" + TABLE_NAME,
+    re.IGNORECASE)
+# Writes WRITE_PATTERN can't place, e.g. WITH ... INSERT
+ANY_WRITE = re.compile(
+    r"^\s*(?:WITH\b.*\b(?:INSERT|REPLACE|UPDATE|DELETE)\b"
+    r"|(?:INSERT|REPLACE|UPDATE|DELETE|DROP|ALTER)\b)",
+    re.IGNORECASE | re.DOTALL)
+
+_commit_listeners = []
+_batches = threading.local()
+
+
+class BatchRolledBack(Exception):
+    """
+    A call inside transaction_batch() failed and the uncommitted part of
+    the batch was rolled back. calls lists every (name, args, kwargs)
+    whose writes were lost, the failing call last; __cause__ is the error.
+    """
+
+    def __init__(self, calls, error):
+        super().__init__(f"Batch of {len(calls)} call(s) rolled back due to: {error}")
+        self.calls = calls
+
+
+def tables_written(statement):
+    """
+    Table modified by a write statement, ALL_TABLES for a write whose
+    target can't be parsed, or None for reads.
+    """
+    match = WRITE_PATTERN.match(statement)
+    if match:
+        return match.group(1).lower()
+    return ALL_TABLES if ANY_WRITE.match(statement) else None
+
+
+def on_commit(callback):
+    """
+    Register callback(tables) to run after every transactional commit,
+    with the set of tables the transaction wrote. It also runs after a
+    rollback with the tables whose writes were discarded, since reads on
+    the same connection (e.g. cached by @cache_query) may have seen them.
+    Bound methods are held weakly so registering a cache does not keep it
+    alive.
+    """
+    if hasattr(callback, "__self__"):
+        callback = weakref.WeakMethod(callback)
+    else:
+        callback = (lambda f: lambda: f)(callback)
+    _commit_listeners.append(callback)
+
+
+def _notify_commit(tables):
+    for ref in list(_commit_listeners):
+        callback = ref()
+        if callback is None:
+            _commit_listeners.remove(ref)
+        else:
+            callback(tables)
+
+
+class TransactionBatch:
+    """Group-commit state for one transaction_batch() block."""
+
+    def __init__(self, conn, max_calls, max_seconds):
+        self.conn = conn
+        self.max_calls = max_calls
+        self.max_seconds = max_seconds
+        self.pending = []
+        self.written = set()
+        self.started = None
+        self.commits = 0
+        self.committed_calls = 0
+        self.rolled_back = []  # one list of calls per rollback
+
+    def trace(self, statement):
+        table = tables_written(statement)
+        if table:
+            self.written.add(table)
+
+    def run(self, func, conn, args, kwargs):
+        if not self.pending:
+            self.started = time.monotonic()
+        self.pending.append((func.__qualname__, args, kwargs))
         try:
             result = func(conn, *args, **kwargs)
-            return result
+        except Exception as e:
+            calls = self.rollback(e)
+            raise BatchRolledBack(calls, e) from e
+        if len(self.pending) >= self.max_calls or \
+                time.monotonic() - self.started >= self.max_seconds:
+            self.commit()
+        return result
+
+    def commit(self):
+        if not self.pending:
+            return
+        self.conn.commit()
+        self.commits += 1
+        self.committed_calls += len(self.pending)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] "
+              f"Batch committed: {len(self.pending)} call(s).")
+        self.pending = []
+        written, self.written = self.written, set()
+        if written:
+            _notify_commit(written)
+
+    def rollback(self, error):
+        self.conn.rollback()
+        calls, self.pending = self.pending, []
+        written, self.written = self.written, set()
+        self.rolled_back.append(calls)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] "
+              f"Batch rolled back due to: {error}. Affected calls: "
+              + ", ".join(f"{name}{args or ''}{kwargs or ''}" for name, args, kwargs in calls))
+        if written:
+            _notify_commit(written)  # drop results cached from uncommitted rows
+        return calls
+
+
+@contextmanager
+def transaction_batch(max_calls=1000, max_seconds=1.0, conn=None):
+    """
+    Share one transaction among the @transactional calls made on this
+    thread inside the block. The batch commits once max_calls calls are
+    pending or max_seconds have passed since its first pending call
+    (checked after each call), and again on exit. A failing call rolls
+    back only the uncommitted calls and raises BatchRolledBack listing
+    them; earlier commits stay. conn defaults to a pooled connection,
+    which with_db_connection hands to every decorated call in the block.
+    """
+    if getattr(_batches, "current", None) is not None:
+        raise RuntimeError("transaction_batch() is already active on this thread")
+    with db_connection.bind_connection(conn) as bound:
+        batch = TransactionBatch(bound, max_calls, max_seconds)
+        _batches.current = batch
+        bound.set_trace_callback(batch.trace)
+        try:
+            yield batch
+            batch.commit()
+        except BaseException as e:
+            if batch.pending:
+                batch.rollback(e)
+            raise
         finally:
-            conn.close()
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Closed database connection.")
-    return wrapper
+            bound.set_trace_callback(None)
+            _batches.current = None
 
 
 def transactional(func):
     """Decorator that wraps DB operations in a transaction."""
+    if inspect.iscoroutinefunction(func):
+        return _async_transactional(func)
+
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
+        batch = getattr(_batches, "current", None)
+        if batch is not None and batch.conn is conn:
+            return batch.run(func, conn, args, kwargs)
         start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"[{start_time}] Starting transaction.")
+        written = set()
+
+        def trace(statement):
+            table = tables_written(statement)
+            if table:
+                written.add(table)
+
+        conn.set_trace_callback(trace)
         try:
             result = func(conn, *args, **kwargs)
             conn.commit()
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Transaction committed.")
-            return result
         except Exception as e:
             conn.rollback()
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Transaction rolled back due to: {e}")
+            if written:
+                _notify_commit(written)  # drop results cached from uncommitted rows
+            raise
+        finally:
+            conn.set_trace_callback(None)
+        if written:
+            _notify_commit(written)
+        return result
+    return wrapper
+
+
+def _async_transactional(func):
+    """transactional for coroutine functions taking an aiosqlite connection."""
+    @functools.wraps(func)
+    async def wrapper(conn, *args, **kwargs):
+        start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{start_time}] Starting transaction.")
+        written = set()
+
+        def trace(statement):  # runs on the aiosqlite worker thread
+            table = tables_written(statement)
+            if table:
+                written.add(table)
+
+        await conn.set_trace_callback(trace)
+        try:
+            result = await func(conn, *args, **kwargs)
+            await conn.commit()
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Transaction committed.")
+        except BaseException as e:
+            await conn.rollback()
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Transaction rolled back due to: {e!r}")
+            if written:
+                _notify_commit(written)  # drop results cached from uncommitted rows
             raise
+        finally:
+            await conn.set_trace_callback(None)
+        if written:
+            _notify_commit(written)
+        return result
     return wrapper
 
 
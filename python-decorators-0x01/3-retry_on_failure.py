@@ -2,47 +2,203 @@
 """
 Decorator that retries database operations if they fail,
 with timestamped logging for resilience and traceability.
+
+Only transient errors are retried, with capped exponential backoff and
+full jitter inside an optional deadline; a circuit breaker fails fast
+once a function keeps failing.
 """
 
 import time
+import random
+import asyncio
+import inspect
 import sqlite3
 import functools
+import threading
 from datetime import datetime  # for logging timestamps
 
+with_db_connection = __import__('1-with_db_connection').with_db_connection
+
+TRANSIENT_MESSAGES = (
+    "database is locked",
+    "database table is locked",
+    "database is busy",
+    "unable to open database file",
+    "disk i/o error",
+)
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a function whose circuit is open."""
+
+
+def is_transient(exc):
+    """True for errors worth retrying: locks, busy databases, I/O hiccups."""
+    if isinstance(exc, sqlite3.OperationalError):
+        message = str(exc).lower()
+        return any(text in message for text in TRANSIENT_MESSAGES)
+    return isinstance(exc, (TimeoutError, ConnectionError))
+
+
+def backoff_delay(attempt, base, cap):
+    """Full-jitter backoff: uniform in [0, min(cap, base * 2**(attempt-1))]."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failed calls and rejects
+    calls for reset_timeout seconds, then lets a single trial call
+    through (half-open): success closes the circuit, failure reopens it,
+    and so does a trial that ends without a verdict (abandon()).
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.trips = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and \
+                    time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                return True
+            return False  # open, or a trial call is already in flight
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
 
-def with_db_connection(func):
-    """Decorator to manage DB connection lifecycle."""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] Opening database connection.")
-        conn = sqlite3.connect('users.db')
-        try:
-            result = func(conn, *args, **kwargs)
-            return result
-        finally:
-            conn.close()
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Closed database connection.")
-    return wrapper
-
-
-def retry_on_failure(retries=3, delay=2):
-    """Decorator that retries a function if it raises an exception."""
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+    def abandon(self):
+        """Reopen a half-open circuit whose trial was cancelled or interrupted."""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+def retry_on_failure(retries=3, delay=2, *, max_delay=30, deadline=None,
+                     retry_on=is_transient, breaker=None):
+    """
+    Decorator that retries a function if it raises a transient exception.
+
+    delay is the backoff base and max_delay its cap; deadline bounds the
+    total time spent across attempts and sleeps. retry_on decides which
+    exceptions are retried. breaker defaults to a CircuitBreaker per
+    decorated function; pass a shared one, or False to disable it.
+    The wrapper exposes stats() and its breaker. Coroutine functions are
+    retried with asyncio.sleep so the event loop keeps running.
+    """
     def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            last_exception = None
-            for attempt in range(1, retries + 1):
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        circuit = CircuitBreaker() if breaker is None else breaker or None
+        counters = {"calls": 0, "retries": 0, "failures": 0, "rejected": 0}
+        counters_lock = threading.Lock()
+
+        def count(name):
+            with counters_lock:
+                counters[name] += 1
+
+        def admit():
+            count("calls")
+            if circuit is not None and not circuit.allow():
+                count("rejected")
+                raise CircuitOpenError(f"Circuit open for {func.__name__}")
+            return time.monotonic()
+
+        def succeeded():
+            if circuit is not None:
+                circuit.record_success()
+
+        def abandoned():
+            """A BaseException (e.g. CancelledError) cut the call short."""
+            if circuit is not None:
+                circuit.abandon()
+
+        def failed(e, attempt, start, timestamp):
+            """Pause before the next attempt; re-raises e when giving up."""
+            if not retry_on(e):
+                print(f"[{timestamp}] Attempt {attempt} failed: {e}. Not retryable.")
+                count("failures")
+                succeeded()  # the database answered
+                raise
+            pause = backoff_delay(attempt, delay, max_delay)
+            out_of_time = deadline is not None and \
+                time.monotonic() - start + pause > deadline
+            if attempt == retries or out_of_time:
+                reason = "deadline exceeded" if out_of_time and attempt < retries \
+                    else f"all {retries} attempts failed"
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Giving up: {reason}.")
+                count("failures")
+                if circuit is not None:
+                    circuit.record_failure()
+                raise
+            print(f"[{timestamp}] Attempt {attempt} failed: {e}. Retrying in {pause:.2f}s...")
+            count("retries")
+            return pause
+
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                start = admit()
                 try:
-                    print(f"[{timestamp}] Attempt {attempt} to execute function...")
-                    return func(*args, **kwargs)
-                except Exception as e:
-                    last_exception = e
-                    print(f"[{timestamp}] Attempt {attempt} failed: {e}. Retrying in {delay}s...")
-                    time.sleep(delay)
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] All {retries} retries failed.")
-            raise last_exception
+                    for attempt in range(1, retries + 1):
+                        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                        try:
+                            print(f"[{timestamp}] Attempt {attempt} to execute function...")
+                            result = await func(*args, **kwargs)
+                        except Exception as e:
+                            await asyncio.sleep(failed(e, attempt, start, timestamp))
+                        else:
+                            succeeded()
+                            return result
+                except BaseException:
+                    abandoned()  # no-op unless a half-open trial is left unresolved
+                    raise
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = admit()
+                try:
+                    for attempt in range(1, retries + 1):
+                        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                        try:
+                            print(f"[{timestamp}] Attempt {attempt} to execute function...")
+                            result = func(*args, **kwargs)
+                        except Exception as e:
+                            time.sleep(failed(e, attempt, start, timestamp))
+                        else:
+                            succeeded()
+                            return result
+                except BaseException:
+                    abandoned()  # no-op unless a half-open trial is left unresolved
+                    raise
+
+        def stats():
+            with counters_lock:
+                snapshot = dict(counters)
+            snapshot["trips"] = circuit.trips if circuit is not None else 0
+            snapshot["state"] = circuit.state if circuit is not None else "disabled"
+            return snapshot
+
+        wrapper.stats = stats
+        wrapper.breaker = circuit
         return wrapper
     return decorator
 
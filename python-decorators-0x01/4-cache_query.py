@@ -4,56 +4,405 @@ Decorator that caches database query results to avoid redundant calls,
 with timestamped logging for improved observability.
 """
 
-import sqlite3
+import re
+import sys
+import time
+import asyncio
+import inspect
+import weakref
 import functools
+import threading
+from collections import OrderedDict
 from datetime import datetime  # for timestamped logging
 
-query_cache = {}  # simple in-memory cache
+transactional = __import__('2-transactional')
+with_db_connection = __import__('1-with_db_connection').with_db_connection
 
+ALL_TABLES = transactional.ALL_TABLES
+READ_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+", re.IGNORECASE)
+# One entry of a FROM list: name, optional "(" of a table-valued function,
+# optional alias, optional comma leading to the next entry
+TABLE_REF = re.compile(
+    transactional.TABLE_NAME + r"(\s*\()?"
+    r"(?:\s+(?:AS\s+)?(?!(?:WHERE|JOIN|INNER|LEFT|RIGHT|FULL|CROSS|NATURAL|OUTER"
+    r"|ON|USING|GROUP|ORDER|LIMIT|OFFSET|HAVING|WINDOW|UNION|EXCEPT|INTERSECT"
+    r"|INDEXED|NOT)\b)\w+)?\s*(,)?\s*",
+    re.IGNORECASE)
 
-def with_db_connection(func):
-    """Decorator to manage DB connection lifecycle."""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{timestamp}] Opening database connection.")
-        conn = sqlite3.connect('users.db')
+
+def tables_read(query):
+    """
+    Names of the tables a SELECT reads from: every FROM list (users u,
+    orders o) and JOIN, schema prefixes dropped. A name it can't make out
+    adds ALL_TABLES, so any write invalidates the result.
+    """
+    query = query or ""
+    tables = set()
+    for clause in READ_PATTERN.finditer(query):
+        pos = clause.end()
+        while not query.startswith("(", pos):  # a subquery's FROM is found on its own
+            ref = TABLE_REF.match(query, pos)
+            if ref is None or ref.group(2):
+                tables.add(ALL_TABLES)
+                break
+            tables.add(ref.group(1).lower())
+            if not ref.group(3):
+                break
+            pos = ref.end()
+    return tables
+
+
+def estimate_size(obj):
+    """Rough deep size in bytes of a query result (rows of plain values)."""
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple, set)):
+        size += sum(estimate_size(item) for item in obj)
+    elif isinstance(obj, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in obj.items())
+    return size
+
+
+class _Flight:
+    """
+    One in-progress execution that concurrent callers can wait on, from
+    threads (done.wait) or coroutines on any event loop (wait_async).
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self._waiters = []  # (loop, future) of coroutines waiting
+        self._lock = threading.Lock()
+
+    def finish(self):
+        with self._lock:
+            self.done.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future)
+
+    async def wait_async(self, timeout=None):
+        """Like done.wait(timeout) without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self.done.is_set():
+                return True
+            self._waiters.append((loop, future))
         try:
-            result = func(conn, *args, **kwargs)
-            return result
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class QueryCache:
+    """
+    Thread-safe LRU cache for query results.
+
+    Entries are evicted least-recently-used first once there are more than
+    max_entries of them or their estimated size exceeds max_bytes, and
+    expire ttl seconds after being stored (None disables either limit).
+    An entry stored with stale_ttl can still be served as stale for that
+    many seconds after it expires. Entries stored with their source tables
+    are dropped by invalidate_tables() when one of those tables changes.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=None, ttl=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # key -> (value, size, expires_at, stale_until, tables)
+        self._entries = OrderedDict()
+        self._by_table = {}  # table -> keys of entries that read it
+        self._inflight = {}  # key -> _Flight
+        self._generation = 0  # bumped by every invalidation
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        self.invalidations = self.stale_hits = self.coalesced = 0
+
+    def lookup(self, key):
+        """Return ("fresh" | "stale" | "miss", value)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[3] is not None and entry[3] <= now:
+                self._remove(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return "miss", None
+            self._entries.move_to_end(key)
+            if entry[2] is not None and entry[2] <= now:
+                return "stale", entry[0]  # counted by served_stale() if used
+            self.hits += 1
+            return "fresh", entry[0]
+
+    def served_stale(self):
+        """Count a stale value handed out while another caller refreshes it."""
+        with self._lock:
+            self.stale_hits += 1
+
+    def get(self, key):
+        """Return (True, value) on a fresh hit, (False, None) otherwise."""
+        state, value = self.lookup(key)
+        return (True, value) if state == "fresh" else (False, None)
+
+    def set(self, key, value, ttl=None, tables=(), stale_ttl=None):
+        with self._lock:
+            self._store(key, value, ttl, tables, stale_ttl)
+
+    def _store(self, key, value, ttl, tables, stale_ttl):
+        ttl = self.ttl if ttl is None else ttl
+        size = estimate_size(value)
+        expires_at = stale_until = None
+        if ttl is not None:
+            expires_at = stale_until = time.monotonic() + ttl
+            if stale_ttl:
+                stale_until += stale_ttl
+        if key in self._entries:
+            self._remove(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # would evict everything and still not fit
+        self._entries[key] = (value, size, expires_at, stale_until, frozenset(tables))
+        self._bytes += size
+        for table in tables:
+            self._by_table.setdefault(table, set()).add(key)
+        while (len(self._entries) > self.max_entries or
+               (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def begin_flight(self, key):
+        """Return (flight, True) for the caller that must run the query,
+        or the in-progress (flight, False) to wait on."""
+        with self._lock:
+            flight = self._inflight.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                return flight, False
+            flight = self._inflight[key] = _Flight(self._generation)
+            return flight, True
+
+    def end_flight(self, key, flight, result=None, error=None, ttl=None,
+                   tables=(), stale_ttl=None):
+        """Publish the leader's outcome; cache it unless an invalidation
+        happened while the query was running."""
+        flight.result, flight.error = result, error
+        try:
+            with self._lock:
+                if self._inflight.get(key) is flight:
+                    del self._inflight[key]
+                if error is None and flight.generation == self._generation:
+                    self._store(key, result, ttl, tables, stale_ttl)
         finally:
-            conn.close()
-            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Closed database connection.")
-    return wrapper
+            flight.finish()
+
+    def _remove(self, key):
+        _, size, _, _, tables = self._entries.pop(key)
+        self._bytes -= size
+        for table in tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def invalidate_tables(self, tables):
+        """Drop every entry that read from any of tables, or from a table
+        that couldn't be parsed; ALL_TABLES in tables drops them all."""
+        with self._lock:
+            self._generation += 1
+            if ALL_TABLES in tables:
+                tables = list(self._by_table)
+            else:
+                tables = [*tables, ALL_TABLES]
+            for table in tables:
+                for key in list(self._by_table.get(table, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._by_table.clear()
+            self._bytes = 0
 
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        return {"entries": len(self._entries), "bytes": self._bytes,
+                "hits": self.hits, "stale_hits": self.stale_hits,
+                "misses": self.misses, "coalesced": self.coalesced,
+                "evictions": self.evictions, "expirations": self.expirations,
+                "invalidations": self.invalidations}
+
+
+query_cache = QueryCache(max_entries=256, max_bytes=16 * 1024 * 1024, ttl=300)
+_subscribed = weakref.WeakSet()
+
+
+def _subscribe(cache):
+    """Invalidate cache when @transactional commits touch its tables."""
+    if cache not in _subscribed:
+        transactional.on_commit(cache.invalidate_tables)
+        _subscribed.add(cache)
+
+
+def _freeze(value):
+    """Hashable form of bound query parameters."""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def make_key(args, kwargs):
+    """Cache key: the query string plus every other bound argument."""
+    kwargs = dict(kwargs)
+    query = kwargs.pop('query', None)
+    if query is None and args:
+        query, args = args[0], args[1:]
+    return (query, _freeze(args), _freeze(kwargs))
+
+
+def cache_query(func=None, *, cache=None, ttl=None, stale_ttl=None,
+                lock_timeout=None):
+    """
+    Decorator to cache SQL query results keyed on the query and its params.
+
+    Usable bare (@cache_query, backed by the module-level query_cache) or
+    configured (@cache_query(cache=QueryCache(...), ttl=60)). Results are
+    dropped when a @transactional write to a table they read commits.
+    Calls on a connection with an open transaction bypass the cache: they
+    may see the transaction's own uncommitted writes, which must neither
+    be published to other callers nor hidden behind an older result.
+
+    Concurrent misses for the same key are coalesced: one caller runs the
+    query and the others wait for its result, for at most lock_timeout
+    seconds before running it themselves. With stale_ttl, an expired
+    result is served for that much longer while a single caller refreshes
+    it; that caller, the first to find the entry expired, waits for the
+    refresh itself, since the connection it was handed cannot outlive the
+    call to refresh in the background. Coroutine functions share the same cache and in-flight queries;
+    their waiters await the leader instead of blocking the event loop.
+    """
+    if func is None:
+        return lambda f: cache_query(f, cache=cache, ttl=ttl, stale_ttl=stale_ttl,
+                                     lock_timeout=lock_timeout)
+    backend = cache if cache is not None else query_cache
+    _subscribe(backend)
+    if inspect.iscoroutinefunction(func):
+        return _async_cache_query(func, backend, ttl, stale_ttl, lock_timeout)
 
-def cache_query(func):
-    """Decorator to cache SQL query results based on the query string."""
     @functools.wraps(func)
     def wrapper(conn, *args, **kwargs):
-        # Extract query argument
-        query = kwargs.get('query') or (args[0] if args else None)
+        key = make_key(args, kwargs)
+        query = key[0]
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if getattr(conn, "in_transaction", False):
+            print(f"[{timestamp}] Bypassing cache inside a transaction: {query}")
+            return func(conn, *args, **kwargs)
 
         # Check if the query result is already cached
-        if query in query_cache:
+        state, result = backend.lookup(key)
+        if state == "fresh":
             print(f"[{timestamp}] Using cached result for query: {query}")
-            return query_cache[query]
+            return result
+
+        flight, leader = backend.begin_flight(key)
+        if not leader:
+            if state == "stale":
+                print(f"[{timestamp}] Using stale result while refreshing query: {query}")
+                backend.served_stale()
+                return result
+            print(f"[{timestamp}] Waiting for in-flight query: {query}")
+            if flight.done.wait(lock_timeout) and \
+                    isinstance(flight.error, (Exception, type(None))):
+                if flight.error is not None:
+                    raise flight.error
+                return flight.result
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] "
+                  f"Leader unavailable, running query directly: {query}")
+            return func(conn, *args, **kwargs)
 
         # Execute and cache the result
         print(f"[{timestamp}] Caching new result for query: {query}")
-        result = func(conn, *args, **kwargs)
-        query_cache[query] = result
+        try:
+            result = func(conn, *args, **kwargs)
+        except BaseException as e:  # an interrupted leader must still release waiters
+            backend.end_flight(key, flight, error=e)
+            raise
+        backend.end_flight(key, flight, result, ttl=ttl, tables=tables_read(query),
+                           stale_ttl=stale_ttl)
+        return result
+    wrapper.cache = backend
+    return wrapper
+
+
+def _async_cache_query(func, backend, ttl, stale_ttl, lock_timeout):
+    """cache_query for coroutine functions; waiters await the leader."""
+    @functools.wraps(func)
+    async def wrapper(conn, *args, **kwargs):
+        key = make_key(args, kwargs)
+        query = key[0]
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        if getattr(conn, "in_transaction", False):
+            print(f"[{timestamp}] Bypassing cache inside a transaction: {query}")
+            return await func(conn, *args, **kwargs)
+
+        state, result = backend.lookup(key)
+        if state == "fresh":
+            print(f"[{timestamp}] Using cached result for query: {query}")
+            return result
+
+        flight, leader = backend.begin_flight(key)
+        if not leader:
+            if state == "stale":
+                print(f"[{timestamp}] Using stale result while refreshing query: {query}")
+                backend.served_stale()
+                return result
+            print(f"[{timestamp}] Waiting for in-flight query: {query}")
+            if await flight.wait_async(lock_timeout) and \
+                    not isinstance(flight.error, asyncio.CancelledError):
+                if flight.error is not None:
+                    raise flight.error
+                return flight.result
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] "
+                  f"Leader unavailable, running query directly: {query}")
+            return await func(conn, *args, **kwargs)
+
+        print(f"[{timestamp}] Caching new result for query: {query}")
+        try:
+            result = await func(conn, *args, **kwargs)
+        except BaseException as e:  # a cancelled leader must still release waiters
+            backend.end_flight(key, flight, error=e)
+            raise
+        backend.end_flight(key, flight, result, ttl=ttl, tables=tables_read(query),
+                           stale_ttl=stale_ttl)
         return result
+    wrapper.cache = backend
     return wrapper
 
 
 @with_db_connection
 @cache_query
-def fetch_users_with_cache(conn, query):
+def fetch_users_with_cache(conn, query, params=()):
     """Fetch users and cache query results."""
     cursor = conn.cursor()
-    cursor.execute(query)
+    cursor.execute(query, params)
     return cursor.fetchall()
 
 
@@ -62,3 +411,9 @@ if __name__ == "__main__":
     print(users)
     users_again = fetch_users_with_cache(query="SELECT * FROM users")
     print(users_again)
+    user = fetch_users_with_cache(query="SELECT * FROM users WHERE id = ?", params=(1,))
+    print(user)
+    transactional.update_user_email(user_id=1, new_email="alice@example.org")
+    users_after_update = fetch_users_with_cache(query="SELECT * FROM users")
+    print(users_after_update)
+    print(query_cache.stats())
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Throughput of update_user_email with one commit per call versus
+transaction_batch() group commits, on a throwaway on-disk users.db.
+
+Usage: python bench_transactional.py [calls] [batch_size]
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import tempfile
+import contextlib
+
+
+def setup(path, users):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, email TEXT, age INTEGER)")
+    conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?)",
+                     ((i, f"user{i}", f"user{i}@example.com", 30) for i in range(users)))
+    conn.commit()
+    conn.close()
+
+
+def timed(label, calls, run):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+    print(f"{label:<22} {calls / elapsed:>10.0f} calls/s  ({elapsed:.2f}s)")
+    return elapsed
+
+
+def main(calls=2000, batch_size=500):
+    workdir = tempfile.mkdtemp()
+    os.chdir(workdir)  # the shared pool opens users.db relative to cwd
+    setup("users.db", users=calls)
+    transactional = __import__('2-transactional')
+    update_user_email = transactional.update_user_email
+
+    def per_call():
+        for i in range(calls):
+            update_user_email(user_id=i, new_email=f"a{i}@example.com")
+
+    def batched():
+        with transactional.transaction_batch(max_calls=batch_size):
+            for i in range(calls):
+                update_user_email(user_id=i, new_email=f"b{i}@example.com")
+
+    print(f"{calls} update_user_email calls, batch size {batch_size}")
+    single = timed("commit per call", calls, per_call)
+    grouped = timed("transaction_batch()", calls, batched)
+    print(f"speedup: {single / grouped:.1f}x")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:3]))
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Tests for the coroutine paths of the decorators"""
+
+import io
+import os
+import asyncio
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+from contextlib import redirect_stdout
+
+try:
+    import aiosqlite
+except ImportError:
+    aiosqlite = None
+
+db_connection = __import__('1-with_db_connection')
+tx = __import__('2-transactional')
+retry_module = __import__('3-retry_on_failure')
+cache_module = __import__('4-cache_query')
+
+
+class QuietTestCase(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        quiet = redirect_stdout(io.StringIO())
+        quiet.__enter__()
+        self.addCleanup(quiet.__exit__, None, None, None)
+
+
+class TestAsyncCacheAndRetry(QuietTestCase):
+
+    async def test_concurrent_misses_run_once(self):
+        calls = []
+
+        @cache_module.cache_query(cache=cache_module.QueryCache())
+        async def fetch(conn, query):
+            calls.append(query)
+            await asyncio.sleep(0.05)
+            return [(1,)]
+
+        results = await asyncio.gather(*(fetch(None, "SELECT * FROM users")
+                                         for _ in range(10)))
+        self.assertEqual(results, [[(1,)]] * 10)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(fetch.cache.coalesced, 9)
+
+    async def test_retry_backs_off_with_asyncio_sleep(self):
+        attempts = []
+
+        @retry_module.retry_on_failure(retries=3, delay=0.01, breaker=False)
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise sqlite3.OperationalError("database is locked")
+            return "ok"
+
+        with mock.patch.object(retry_module.time, "sleep") as blocking_sleep:
+            self.assertEqual(await flaky(), "ok")
+        blocking_sleep.assert_not_called()
+        self.assertEqual(flaky.stats()["retries"], 2)
+
+    async def test_cancelled_trial_reopens_the_circuit(self):
+        breaker = retry_module.CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        breaker.state = "open"  # reset_timeout already elapsed: half-open trial
+
+        @retry_module.retry_on_failure(retries=3, delay=0.01, breaker=breaker)
+        async def slow():
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(slow())
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertEqual(breaker.state, "open")
+
+
+@unittest.skipUnless(aiosqlite, "aiosqlite is not installed")
+class TestAsyncConnectionAndTransaction(QuietTestCase):
+
+    def setUp(self):
+        super().setUp()
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        conn = sqlite3.connect(self.path)
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, email TEXT)")
+        conn.execute("INSERT INTO users VALUES (1, 'old@example.com')")
+        conn.commit()
+        conn.close()
+        patcher = mock.patch.object(db_connection.pool, "database", self.path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_transaction_commits_and_rolls_back(self):
+        @db_connection.with_db_connection
+        @tx.transactional
+        async def set_email(conn, email, fail=False):
+            await conn.execute("UPDATE users SET email = ? WHERE id = 1", (email,))
+            if fail:
+                raise ValueError("boom")
+
+        @db_connection.with_db_connection
+        async def email(conn):
+            async with conn.execute("SELECT email FROM users WHERE id = 1") as cursor:
+                return (await cursor.fetchone())[0]
+
+        await set_email("new@example.com")
+        with self.assertRaises(ValueError):
+            await set_email("lost@example.com", fail=True)
+        self.assertEqual(await email(), "new@example.com")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Tests for the cache_query decorator and its QueryCache backend"""
+
+import io
+import sqlite3
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+
+cache_module = __import__('4-cache_query')
+QueryCache = cache_module.QueryCache
+cache_query = cache_module.cache_query
+tables_read = cache_module.tables_read
+tx = __import__('2-transactional')
+
+
+def run_concurrently(func, callers):
+    """Start callers threads at the same instant and collect results."""
+    barrier = threading.Barrier(callers)
+    results = []
+
+    def call():
+        barrier.wait()
+        results.append(func(None, query="SELECT * FROM users"))
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Concurrent misses on one key hit the database once"""
+
+    def setUp(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def slow_query(self, delay):
+        def fetch(conn, query):
+            with self.lock:
+                self.calls += 1
+            time.sleep(delay)
+            return [(1, "Alice")]
+        return fetch
+
+    def test_cold_cache_runs_query_once(self):
+        """20 concurrent callers on a cold cache cause exactly one hit"""
+        fetch = cache_query(self.slow_query(0.2), cache=QueryCache())
+        results = run_concurrently(fetch, 20)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [[(1, "Alice")]] * 20)
+        self.assertEqual(fetch.cache.coalesced, 19)
+
+    def test_lock_timeout_falls_back_to_query(self):
+        """Waiters give up after lock_timeout and run the query themselves"""
+        fetch = cache_query(self.slow_query(0.3), cache=QueryCache(),
+                            lock_timeout=0.05)
+        run_concurrently(fetch, 5)
+        self.assertEqual(self.calls, 5)
+
+    def test_leader_error_reaches_waiters(self):
+        """An exception in the leader is raised to every waiter"""
+        def failing(conn, query):
+            time.sleep(0.1)
+            raise RuntimeError("database is locked")
+
+        fetch = cache_query(failing, cache=QueryCache())
+        errors = []
+
+        def call():
+            try:
+                fetch(None, query="SELECT 1")
+            except RuntimeError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(len(fetch.cache), 0)
+
+    def test_interrupted_leader_releases_waiters(self):
+        """Waiters run the query themselves when the leader exits abruptly"""
+        class Interrupted(BaseException):
+            pass
+
+        leader_started = threading.Event()
+
+        def fetch(conn, query):
+            if not leader_started.is_set():
+                leader_started.set()
+                time.sleep(0.1)
+                raise Interrupted
+            return [(1, "Alice")]
+
+        def lead():
+            with self.assertRaises(Interrupted):
+                fetch(None, query="SELECT * FROM users")
+
+        fetch = cache_query(fetch, cache=QueryCache(), lock_timeout=5)
+        leader = threading.Thread(target=lead)
+        leader.start()
+        leader_started.wait()
+        started = time.monotonic()
+        self.assertEqual(fetch(None, query="SELECT * FROM users"), [(1, "Alice")])
+        self.assertLess(time.monotonic() - started, 1)
+        leader.join()
+
+    def test_stale_while_revalidate(self):
+        """Expired entries are served stale while one caller refreshes"""
+        fetch = cache_query(self.slow_query(0.2), cache=QueryCache(),
+                            ttl=0.01, stale_ttl=10)
+        fetch(None, query="SELECT * FROM users")
+        time.sleep(0.02)
+        results = run_concurrently(fetch, 10)
+        self.assertEqual(self.calls, 2)
+        self.assertEqual(results, [[(1, "Alice")]] * 10)
+        self.assertEqual(fetch.cache.stale_hits, 9)  # the 10th refreshed it
+
+
+class TestEviction(unittest.TestCase):
+    """QueryCache stays within its entry, byte and time limits"""
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = QueryCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now least recently used
+        cache.set("c", 3)
+        self.assertEqual(cache.get("b"), (False, None))
+        self.assertEqual(cache.get("a"), (True, 1))
+        self.assertEqual(cache.get("c"), (True, 3))
+        self.assertEqual(cache.evictions, 1)
+
+    def test_byte_budget_is_enforced(self):
+        row = [(1, "x" * 100)]
+        size = cache_module.estimate_size(row)
+        cache = QueryCache(max_bytes=size * 2)
+        for key in "abc":
+            cache.set(key, row)
+        self.assertEqual(len(cache), 2)
+        self.assertLessEqual(cache.stats()["bytes"], size * 2)
+        self.assertEqual(cache.get("a"), (False, None))
+        cache.set("huge", [(1, "x" * 10000)])  # larger than the whole budget
+        self.assertEqual(cache.get("huge"), (False, None))
+        self.assertEqual(len(cache), 2)
+
+    def test_entries_expire_after_ttl(self):
+        cache = QueryCache(ttl=0.01)
+        cache.set("a", 1)
+        cache.set("b", 2, ttl=60)
+        time.sleep(0.02)
+        self.assertEqual(cache.get("a"), (False, None))
+        self.assertEqual(cache.get("b"), (True, 2))
+        self.assertEqual(cache.expirations, 1)
+        self.assertEqual(len(cache), 1)
+
+
+class TestInvalidation(unittest.TestCase):
+    """Writes drop the cached results of every query that read the table"""
+
+    def test_tables_read_parses_lists_joins_and_qualified_names(self):
+        self.assertEqual(tables_read("SELECT * FROM users u, orders o WHERE u.id = o.user_id"),
+                         {"users", "orders"})
+        self.assertEqual(tables_read('SELECT * FROM main.users AS u JOIN "orders" o ON 1'),
+                         {"users", "orders"})
+        self.assertEqual(tables_read("SELECT * FROM users WHERE id IN (SELECT user_id FROM orders)"),
+                         {"users", "orders"})
+        self.assertEqual(tables_read("SELECT value FROM json_each(?)"), {cache_module.ALL_TABLES})
+
+    def test_tables_written_parses_qualified_names(self):
+        self.assertEqual(tx.tables_written("INSERT INTO main.users VALUES (1)"), "users")
+        self.assertEqual(tx.tables_written("WITH n AS (SELECT 1) INSERT INTO users SELECT * FROM n"),
+                         tx.ALL_TABLES)
+        self.assertIsNone(tx.tables_written("SELECT * FROM users"))
+
+    def test_invalidation_drops_only_dependent_entries(self):
+        cache = QueryCache()
+        cache.set("joined", 1, tables=tables_read("SELECT * FROM users u, orders o"))
+        cache.set("orders", 2, tables=tables_read("SELECT * FROM orders"))
+        cache.set("unknown", 3, tables=tables_read("SELECT * FROM json_each(?)"))
+        cache.invalidate_tables({"users"})
+        self.assertEqual(cache.get("joined"), (False, None))
+        self.assertEqual(cache.get("unknown"), (False, None))
+        self.assertEqual(cache.get("orders"), (True, 2))
+        cache.invalidate_tables({tx.ALL_TABLES})
+        self.assertEqual(len(cache), 0)
+
+    def test_committed_write_invalidates_cached_read(self):
+        conn = sqlite3.connect(":memory:")
+        conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, age INTEGER)")
+        conn.execute("INSERT INTO users VALUES (1, 30)")
+
+        @cache_query(cache=QueryCache())
+        def fetch(conn, query):
+            return conn.execute(query).fetchall()
+
+        @tx.transactional
+        def add_user(conn):
+            conn.execute("INSERT INTO main.users VALUES (2, 40)")
+
+        query = "SELECT u.id FROM main.users AS u, users v WHERE u.id = v.id"
+        self.assertEqual(fetch(conn, query), [(1,)])
+        with redirect_stdout(io.StringIO()):
+            add_user(conn)
+        self.assertEqual(fetch(conn, query), [(1,), (2,)])
+
+
+if __name__ == "__main__":
+    unittest.main()
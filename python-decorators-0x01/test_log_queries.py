@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Tests for the queue-backed log_queries decorator"""
+
+import logging
+import threading
+import unittest
+from unittest import mock
+
+log_module = __import__('0-log_queries')
+log_queries = log_module.log_queries
+
+
+class CapturingHandler(logging.Handler):
+    """Keeps every record and the thread that emitted it."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((record, threading.get_ident()))
+
+
+class TestLogQueries(unittest.TestCase):
+
+    def setUp(self):
+        log_module.stop_logging()
+        self.handler = CapturingHandler()
+        log_module.start_logging(self.handler)
+        self.addCleanup(log_module.stop_logging)
+
+    def logged(self):
+        """Flush the writer and return the query infos it handled."""
+        log_module.stop_logging()
+        return [record.query for record, _ in self.handler.records]
+
+    def test_writer_thread_builds_and_emits_records(self):
+        @log_queries
+        def fetch(conn, query, params=()):
+            return [(1,), (2,)]
+
+        fetch(None, "SELECT * FROM users WHERE id = 7", (7,))
+        log_module.stop_logging()
+        [(record, emitted_on)] = self.handler.records
+        self.assertNotEqual(emitted_on, threading.get_ident())
+        self.assertEqual(record.query["thread"], threading.get_ident())
+        self.assertEqual(record.query["fingerprint"], "SELECT * FROM users WHERE id = ?")
+        self.assertEqual(record.query["params"], (7,))
+        self.assertEqual(record.query["rowcount"], 2)
+
+    def test_sample_rate_keeps_a_fraction(self):
+        @log_queries(sample_rate=0.5)
+        def fetch(query):
+            return []
+
+        with mock.patch.object(log_module.random, "random", side_effect=[0.2, 0.7, 0.4]):
+            for _ in range(3):
+                fetch("SELECT 1")
+        self.assertEqual(len(self.logged()), 2)
+
+    def test_slow_queries_bypass_sampling(self):
+        @log_queries(sample_rate=0, slow_ms=0)
+        def slow(query):
+            return []
+
+        @log_queries(sample_rate=0, slow_ms=10_000)
+        def fast(query):
+            return []
+
+        slow("SELECT 1")
+        fast("SELECT 2")
+        [info] = self.logged()
+        self.assertEqual(info["fingerprint"], "SELECT ?")
+        self.assertTrue(info["slow"])
+
+    def test_errors_are_always_logged(self):
+        @log_queries(sample_rate=0)
+        def broken(query):
+            raise RuntimeError("no such table: users")
+
+        with self.assertRaises(RuntimeError):
+            broken("SELECT * FROM users")
+        [info] = self.logged()
+        self.assertIn("no such table", info["error"])
+        self.assertIsNone(info["rowcount"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Tests for query fingerprinting and latency histograms"""
+
+import json
+import random
+import unittest
+
+profile_module = __import__('5-profile_queries')
+LatencyHistogram = profile_module.LatencyHistogram
+QueryProfiler = profile_module.QueryProfiler
+profile_query = profile_module.profile_query
+
+
+class TestLatencyHistogram(unittest.TestCase):
+
+    def test_percentiles_within_bucket_precision(self):
+        rng = random.Random(7)
+        values = sorted(int(rng.lognormvariate(7, 1.5)) for _ in range(20000))
+        hist = LatencyHistogram()
+        for value in values:
+            hist.record(value)
+        for q in (0.5, 0.95, 0.99):
+            exact = values[int(q * len(values)) - 1]
+            self.assertAlmostEqual(hist.percentile(q), exact, delta=exact / 64 + 1)
+
+
+class TestProfileQuery(unittest.TestCase):
+
+    def test_calls_grouped_by_fingerprint(self):
+        registry = QueryProfiler()
+
+        @profile_query(registry=registry)
+        def fetch(conn, query):
+            return [(1,), (2,)]
+
+        @profile_query(registry=registry)
+        def fetch_all(conn):
+            return []
+
+        fetch(None, "SELECT * FROM users WHERE id = 1")
+        fetch(None, query="SELECT *  FROM users WHERE id = 42")
+        fetch_all(None)
+
+        stats = json.loads(registry.dump("json"))
+        self.assertEqual(stats["SELECT * FROM users WHERE id = ?"]["calls"], 2)
+        self.assertEqual(stats["SELECT * FROM users WHERE id = ?"]["rows"], 4)
+        self.assertIn(f"{fetch_all.__qualname__}()", stats)
+
+        text = registry.dump("prometheus")
+        self.assertIn('query_latency_seconds_count{fingerprint="SELECT * FROM users '
+                      'WHERE id = ?"} 2', text)
+        self.assertIn("# TYPE query_rows_total counter", text)
+
+
+if __name__ == "__main__":
+    unittest.main()
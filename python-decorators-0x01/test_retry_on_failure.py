@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Tests for retry classification, backoff and the circuit breaker"""
+
+import sqlite3
+import unittest
+from unittest import mock
+
+retry_module = __import__('3-retry_on_failure')
+retry_on_failure = retry_module.retry_on_failure
+CircuitBreaker = retry_module.CircuitBreaker
+CircuitOpenError = retry_module.CircuitOpenError
+
+
+def failing(exc, times):
+    """Function raising exc for the first `times` calls, then returning 'ok'."""
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) <= times:
+            raise exc
+        return "ok"
+    func.calls = calls
+    return func
+
+
+class TestRetryOnFailure(unittest.TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(retry_module.time, "sleep")
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_transient_error_is_retried_without_sleeping_after_last(self):
+        func = failing(sqlite3.OperationalError("database is locked"), times=5)
+        wrapped = retry_on_failure(retries=3, delay=0.1, breaker=False)(func)
+        with self.assertRaises(sqlite3.OperationalError):
+            wrapped()
+        self.assertEqual(len(func.calls), 3)
+        self.assertEqual(self.sleep.call_count, 2)
+        self.assertEqual(wrapped.stats()["retries"], 2)
+
+    def test_non_transient_error_is_not_retried(self):
+        func = failing(sqlite3.OperationalError("near \"SELEC\": syntax error"), times=1)
+        wrapped = retry_on_failure(retries=3, delay=0.1)(func)
+        with self.assertRaises(sqlite3.OperationalError):
+            wrapped()
+        self.assertEqual(len(func.calls), 1)
+        self.sleep.assert_not_called()
+
+    def test_backoff_is_jittered_and_capped(self):
+        func = failing(TimeoutError(), times=4)
+        wrapped = retry_on_failure(retries=5, delay=1, max_delay=3, breaker=False)(func)
+        self.assertEqual(wrapped(), "ok")
+        pauses = [call.args[0] for call in self.sleep.call_args_list]
+        self.assertEqual(len(pauses), 4)
+        for attempt, pause in enumerate(pauses, start=1):
+            self.assertLessEqual(pause, min(3, 2 ** (attempt - 1)))
+
+    def test_breaker_trips_then_recovers(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        func = failing(sqlite3.OperationalError("database is locked"), times=4)
+        wrapped = retry_on_failure(retries=2, delay=0, breaker=breaker)(func)
+        for _ in range(2):
+            with self.assertRaises(sqlite3.OperationalError):
+                wrapped()
+        with self.assertRaises(CircuitOpenError):
+            wrapped()
+        self.assertEqual(len(func.calls), 4)
+        self.assertEqual(wrapped.stats()["trips"], 1)
+        self.assertEqual(wrapped.stats()["rejected"], 1)
+
+        breaker._opened_at -= 60  # reset_timeout elapsed: half-open trial
+        self.assertEqual(wrapped(), "ok")
+        self.assertEqual(breaker.state, "closed")
+
+    def test_interrupted_trial_reopens_the_circuit(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        func = failing(KeyboardInterrupt(), times=1)
+        wrapped = retry_on_failure(retries=2, delay=0, breaker=breaker)(func)
+        breaker.state = "open"  # reset_timeout already elapsed: half-open trial
+        with self.assertRaises(KeyboardInterrupt):
+            wrapped()
+        self.assertEqual(breaker.state, "open")
+        with self.assertRaises(CircuitOpenError):
+            wrapped()
+        breaker._opened_at -= 60
+        self.assertEqual(wrapped(), "ok")
+        self.assertEqual(breaker.state, "closed")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Tests for batched write transactions"""
+
+import io
+import sqlite3
+import unittest
+from contextlib import redirect_stdout
+
+tx = __import__('2-transactional')
+cache_module = __import__('4-cache_query')
+
+
+@tx.with_db_connection
+@tx.transactional
+def set_age(conn, user_id, age):
+    conn.execute("UPDATE users SET age = ? WHERE id = ?", (age, user_id))
+    if age < 0:
+        raise ValueError("negative age")
+
+
+@tx.with_db_connection
+@cache_module.cache_query(cache=cache_module.QueryCache())
+def read_age(conn, query, params=()):
+    return conn.execute(query, params).fetchone()[0]
+
+
+class TestTransactionBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, age INTEGER)")
+        self.conn.executemany("INSERT INTO users VALUES (?, 0)", [(i,) for i in range(6)])
+        self.conn.commit()
+        quiet = redirect_stdout(io.StringIO())
+        quiet.__enter__()
+        self.addCleanup(quiet.__exit__, None, None, None)
+
+    def ages(self):
+        return [age for age, in self.conn.execute("SELECT age FROM users ORDER BY id")]
+
+    def test_commits_by_count_and_on_exit(self):
+        with tx.transaction_batch(max_calls=2, max_seconds=60, conn=self.conn) as batch:
+            for user_id in range(5):
+                set_age(user_id=user_id, age=10)
+        self.assertEqual(batch.commits, 3)
+        self.assertEqual(batch.committed_calls, 5)
+        self.assertEqual(self.ages(), [10, 10, 10, 10, 10, 0])
+
+    def test_failure_rolls_back_only_the_pending_batch(self):
+        with self.assertRaises(tx.BatchRolledBack) as raised:
+            with tx.transaction_batch(max_calls=2, max_seconds=60, conn=self.conn):
+                set_age(user_id=0, age=1)
+                set_age(user_id=1, age=1)   # commits the first batch
+                set_age(user_id=2, age=1)
+                set_age(user_id=3, age=-1)  # fails: rolls back ids 2 and 3
+        self.assertEqual([call[2] for call in raised.exception.calls],
+                         [{"user_id": 2, "age": 1}, {"user_id": 3, "age": -1}])
+        self.assertIsInstance(raised.exception.__cause__, ValueError)
+        self.assertEqual(self.ages(), [1, 1, 0, 0, 0, 0])
+
+    def test_uncommitted_reads_are_not_cached(self):
+        query = "SELECT age FROM users WHERE id = ?"
+        with self.assertRaises(tx.BatchRolledBack):
+            with tx.transaction_batch(max_calls=10, max_seconds=60, conn=self.conn):
+                set_age(user_id=4, age=99)
+                self.assertEqual(read_age(query, (4,)), 99)  # own dirty write
+                self.assertEqual(len(read_age.cache), 0)
+                set_age(user_id=5, age=-1)
+        with tx.db_connection.bind_connection(self.conn):
+            self.assertEqual(read_age(query, (4,)), 0)
+        self.assertEqual(len(read_age.cache), 1)  # committed read is cached
+
+
+if __name__ == "__main__":
+    unittest.main()
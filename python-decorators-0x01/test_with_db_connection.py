@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Tests for the SQLite connection pool behind with_db_connection"""
+
+import os
+import time
+import tempfile
+import unittest
+
+db_connection = __import__('1-with_db_connection')
+SQLitePool = db_connection.SQLitePool
+PoolTimeout = db_connection.PoolTimeout
+
+
+class TestSQLitePool(unittest.TestCase):
+    """Connections are bounded, evicted, health-checked and reset"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.database = os.path.join(directory.name, "users.db")
+
+    def make_pool(self, **options):
+        pool = SQLitePool(self.database, **options)
+        self.addCleanup(pool.close_all)
+        return pool
+
+    def test_max_size_and_checkout_timeout(self):
+        pool = self.make_pool(max_size=2, checkout_timeout=0.1)
+        first, second = pool.acquire(), pool.acquire()
+        with self.assertRaises(PoolTimeout):
+            pool.acquire()
+        pool.release(first)
+        self.assertIs(pool.acquire(), first)
+        pool.release(first)
+        pool.release(second)
+
+    def test_idle_connections_are_evicted(self):
+        pool = self.make_pool(idle_timeout=0.01)
+        conn = pool.acquire()
+        pool.release(conn)
+        time.sleep(0.02)
+        self.assertIsNot(pool.acquire(), conn)
+        self.assertEqual(pool._open, 1)
+
+    def test_broken_connection_is_discarded_on_checkout(self):
+        pool = self.make_pool()
+        conn = pool.acquire()
+        pool.release(conn)
+        conn.close()  # e.g. closed behind the pool's back
+        replacement = pool.acquire()
+        self.assertIsNot(replacement, conn)
+        self.assertEqual(replacement.execute("SELECT 1").fetchone(), (1,))
+        self.assertEqual(pool._open, 1)
+
+    def test_release_rolls_back_open_transaction(self):
+        pool = self.make_pool()
+        with pool.connection() as conn:
+            conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY)")
+            conn.commit()
+            conn.execute("INSERT INTO users VALUES (1)")
+        with pool.connection() as again:
+            self.assertIs(again, conn)
+            self.assertFalse(again.in_transaction)
+            self.assertEqual(again.execute("SELECT COUNT(*) FROM users").fetchone(), (0,))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,36 @@
 import seed
 
-def stream_users():
+
+def stream_users(fetch_size=1000, row_format="dict", columns=None, where=None):
+    """
+    Generator that yields users one at a time.
+
+    Rows are read through an unbuffered cursor in fetchmany(fetch_size)
+    round trips, so at most fetch_size rows are held in client memory no
+    matter how large user_data is. Pass fetch_size=None to iterate the
+    cursor row by row instead.
+
+    row_format is "dict" (default), "tuple" or "slots" (seed.UserRow); the
+    last two avoid building a dict per row. columns and where (for example
+    where=("age", ">", 25)) are compiled into the query by seed.build_select.
+    """
+    query, params = seed.build_select(columns, where, row_format)
     connection = seed.connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM user_data")
+    cursor = seed.row_cursor(connection, row_format, buffered=False)
+    try:
+        cursor.execute(query, params)
 
-    for row in cursor:
-        yield row  # ✅ yields one user at a time
+        if fetch_size is None:
+            for row in cursor:
+                if row_format == "slots":
+                    row = seed.UserRow(*row)
+                yield row  # ✅ yields one user at a time
+            return
 
-    cursor.close()
-    connection.close()
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield from seed.convert_rows(rows, row_format)
+    finally:
+        seed.close_stream(cursor, connection)
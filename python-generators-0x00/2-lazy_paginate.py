@@ -1,18 +1,76 @@
+import base64
+import json
+
 import seed
 
-def paginate_users(page_size, offset):
+
+def paginate_users(page_size, offset, row_format="dict"):
     connection = seed.connect_to_prodev()
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
+    try:
+        cursor = seed.row_cursor(connection, row_format)
+        cursor.execute(f"SELECT * FROM user_data LIMIT {page_size} OFFSET {offset}")
+        rows = cursor.fetchall()
+    finally:
+        connection.close()
+    return seed.convert_rows(rows, row_format)
+
+
+def paginate_users_after(connection, page_size, last_seen=None, row_format="dict"):
+    """
+    Fetch the page of users that follows user_id last_seen.
+
+    Seeks on the primary key instead of skipping rows, so every page costs
+    O(page_size) whatever its position in the table.
+    """
+    cursor = seed.row_cursor(connection, row_format)
+    if last_seen is None:
+        cursor.execute(
+            "SELECT * FROM user_data ORDER BY user_id LIMIT %s", (page_size,))
+    else:
+        cursor.execute(
+            "SELECT * FROM user_data WHERE user_id > %s "
+            "ORDER BY user_id LIMIT %s", (last_seen, page_size))
     rows = cursor.fetchall()
-    connection.close()
-    return rows
-
-def lazy_pagination(page_size):
-    offset = 0
-    while True:
-        page = paginate_users(page_size, offset)
-        if not page:
-            break
-        yield page
-        offset += page_size
+    cursor.close()
+    return seed.convert_rows(rows, row_format)
+
+
+def page_token(page):
+    """Opaque token that resumes keyset pagination right after page."""
+    payload = json.dumps({"after": seed.user_id_of(page[-1])}).encode()
+    return base64.urlsafe_b64encode(payload).decode()
+
+
+def _decode_token(token):
+    return json.loads(base64.urlsafe_b64decode(token.encode()))["after"]
+
+
+def lazy_pagination(page_size, keyset=False, token=None, row_format="dict"):
+    """
+    Generator that yields pages of users, fetching each one on demand.
+
+    With keyset=True pages are read in user_id order over a single
+    connection; pass a token from page_token() to resume after that page.
+    row_format is "dict" (default), "tuple" or "slots" (seed.UserRow).
+    """
+    if not keyset:
+        offset = 0
+        while True:
+            page = paginate_users(page_size, offset, row_format)
+            if not page:
+                break
+            yield page
+            offset += page_size
+        return
+
+    last_seen = _decode_token(token) if token else None
+    connection = seed.connect_to_prodev()
+    try:
+        while True:
+            page = paginate_users_after(connection, page_size, last_seen, row_format)
+            if not page:
+                break
+            yield page
+            last_seen = seed.user_id_of(page[-1])
+    finally:
+        connection.close()
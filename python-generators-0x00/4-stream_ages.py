@@ -1,24 +1,171 @@
+import math
+
+import mysql.connector
+
 import seed
 
+
 def stream_user_ages():
     connection = seed.connect_to_prodev()
     cursor = connection.cursor()
-    cursor.execute("SELECT age FROM user_data")
+    try:
+        cursor.execute("SELECT age FROM user_data")
+
+        for (age,) in cursor:
+            yield float(age)
+    finally:
+        seed.close_stream(cursor, connection)
+
+
+class TDigest:
+    """
+    Merging t-digest: approximate quantiles in O(compression) memory.
+
+    Values are buffered and periodically folded into at most ~compression
+    centroids, kept small near the tails so extreme percentiles stay sharp.
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.count = 0
+        self._centroids = []  # [mean, weight] pairs sorted by mean
+        self._buffer = []
+
+    def add(self, value):
+        self._buffer.append(value)
+        self.count += 1
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def _scale(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _scale_inverse(self, k):
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self):
+        if not self._buffer:
+            return
+        points = sorted(self._centroids + [[v, 1] for v in self._buffer])
+        self._buffer = []
+        merged = [points[0][:]]
+        weight_before = 0
+        q_limit = self._scale_inverse(self._scale(0) + 1)
+        for mean, weight in points[1:]:
+            current = merged[-1]
+            q = (weight_before + current[1] + weight) / self.count
+            if q <= q_limit:
+                total = current[1] + weight
+                current[0] += (mean - current[0]) * weight / total
+                current[1] = total
+            else:
+                weight_before += current[1]
+                q_limit = self._scale_inverse(
+                    self._scale(weight_before / self.count) + 1)
+                merged.append([mean, weight])
+        self._centroids = merged
+
+    def quantile(self, q):
+        """Estimated value at quantile q (0..1), or None if empty."""
+        self._compress()
+        if not self._centroids:
+            return None
+        if len(self._centroids) == 1:
+            return self._centroids[0][0]
+        target = q * self.count
+        cumulative = 0
+        previous_mid, previous_mean = None, None
+        for mean, weight in self._centroids:
+            mid = cumulative + weight / 2
+            if target <= mid:
+                if previous_mid is None:
+                    return mean
+                fraction = (target - previous_mid) / (mid - previous_mid)
+                return previous_mean + fraction * (mean - previous_mean)
+            previous_mid, previous_mean = mid, mean
+            cumulative += weight
+        return self._centroids[-1][0]
+
+
+class AgeStats:
+    """Single-pass, constant-memory accumulator (Welford + t-digest)."""
+
+    def __init__(self, compression=100):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = None
+        self.max = None
+        self.digest = TDigest(compression)
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.digest.add(value)
+
+    @property
+    def variance(self):
+        """Population variance, matching SQL VAR_POP."""
+        return self._m2 / self.count if self.count else None
+
+
+def _sql_age_stats():
+    connection = seed.connect_to_prodev()
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT COUNT(age), AVG(age), MIN(age), MAX(age), VAR_POP(age) "
+            "FROM user_data")
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+        connection.close()
+    count = int(row[0])
+    if not count:
+        return {"count": 0, "mean": None, "min": None, "max": None,
+                "variance": None}
+    mean, low, high, variance = (float(v) for v in row[1:])
+    return {"count": count, "mean": mean, "min": low, "max": high,
+            "variance": variance}
+
+
+def age_stats(percentiles=(), pushdown=True):
+    """
+    Count, mean, min, max, population variance and percentiles of user ages.
+
+    With pushdown the scalar aggregates are computed by the database in one
+    query. Percentiles, which MySQL cannot aggregate, are estimated from a
+    single streaming pass with a t-digest; if the aggregate query fails the
+    whole result comes from that streaming pass instead.
+    """
+    stats = None
+    if pushdown:
+        try:
+            stats = _sql_age_stats()
+        except mysql.connector.Error:
+            stats = None
 
-    for (age,) in cursor:
-        yield float(age)
+    if stats is None or percentiles:
+        acc = AgeStats()
+        for age in stream_user_ages():
+            acc.add(age)
+        if stats is None:
+            stats = {"count": acc.count,
+                     "mean": acc.mean if acc.count else None,
+                     "min": acc.min, "max": acc.max,
+                     "variance": acc.variance}
+        stats["percentiles"] = {
+            p: acc.digest.quantile(p / 100) for p in percentiles}
+    return stats
 
-    cursor.close()
-    connection.close()
 
 def compute_average_age():
-    total, count = 0, 0
-    for age in stream_user_ages():
-        total += age
-        count += 1
-
-    if count > 0:
-        avg = total / count
-        print(f"Average age of users: {avg:.2f}")
+    stats = age_stats()
+    if stats["count"] > 0:
+        print(f"Average age of users: {stats['mean']:.2f}")
     else:
         print("No data available.")
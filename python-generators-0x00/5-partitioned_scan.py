@@ -0,0 +1,213 @@
+#!/usr/bin/python3
+"""Parallel, range-partitioned scan of user_data"""
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+import seed
+
+KEYSPACE = 16 ** 8  # user_id is a UUID string; partition on its first 8 hex digits
+
+
+def partition_bounds(partitions):
+    """Split the user_id keyspace into `partitions` [lo, hi) string ranges."""
+    cuts = [f"{i * KEYSPACE // partitions:08x}" for i in range(1, partitions)]
+    lows = [None] + cuts
+    highs = cuts + [None]
+    return list(zip(lows, highs))
+
+
+def _range_query(lo, hi):
+    clauses, params = [], []
+    if lo is not None:
+        clauses.append("user_id >= %s")
+        params.append(lo)
+    if hi is not None:
+        clauses.append("user_id < %s")
+        params.append(hi)
+    where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+    return f"SELECT * FROM user_data{where} ORDER BY user_id", params
+
+
+def scan_partition(lo, hi, batch_size, pool=None):
+    """
+    Generator that yields batches of users with lo <= user_id < hi, on a
+    connection from pool (default: the connect_to_prodev() pool).
+    """
+    connection = (pool or seed.get_pool()).acquire()
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(*_range_query(lo, hi))
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        seed.close_stream(cursor, connection)
+
+
+def _scan_to_queue(index, lo, hi, batch_size, q, stop):
+    """Process-executor worker: stream one partition's batches into q."""
+    start = time.perf_counter()
+    rows = 0
+    try:
+        with closing(scan_partition(lo, hi, batch_size)) as batches:
+            for batch in batches:
+                rows += len(batch)
+                if not _put(q, (index, "rows", batch), stop):
+                    q.cancel_join_thread()  # nobody will read what is still buffered
+                    return
+        message = (index, "done", (rows, time.perf_counter() - start))
+    except Exception as e:
+        message = (index, "error", e)
+    _put(q, message, stop)
+
+
+def _put(q, item, stop):
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+class PartitionedScan:
+    """
+    Iterate user_data with `partitions` concurrent range scans.
+
+    Rows from all partitions are merged into one stream. With ordered=True
+    they come out in user_id order (partition by partition); otherwise each
+    batch is yielded as soon as any partition produces it. executor is
+    "thread" or "process" (one worker process per partition); either way
+    rows are streamed through bounded queues of queue_size batches, so at
+    most that many batches per partition are held in memory, and closing
+    the generator early stops every worker.
+
+    Each partition holds its connection for the whole scan, so the thread
+    executor opens a pool of `partitions` connections of its own rather
+    than queueing behind the shared connect_to_prodev() pool, whose
+    checkout_timeout a slow consumer would otherwise exceed.
+
+    After, or during, iteration `stats` holds one entry per partition with
+    its key range, row count and elapsed seconds (process workers report
+    theirs when the partition completes).
+    """
+
+    def __init__(self, partitions=4, batch_size=1000, ordered=False,
+                 executor="thread", queue_size=4):
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown executor: {executor!r}")
+        self.partitions = partitions
+        self.batch_size = batch_size
+        self.ordered = ordered
+        self.executor = executor
+        self.queue_size = queue_size
+        self.stats = [
+            {"partition": i, "lo": lo, "hi": hi, "rows": 0, "seconds": None}
+            for i, (lo, hi) in enumerate(partition_bounds(partitions))
+        ]
+
+    def __iter__(self):
+        if self.executor == "process":
+            return self._iter_processes()
+        return self._iter_threads()
+
+    def _scan_into(self, index, q, stop, connections):
+        stat = self.stats[index]
+        start = time.perf_counter()
+        message = (index, "done", None)
+        try:
+            with closing(scan_partition(stat["lo"], stat["hi"], self.batch_size,
+                                        connections)) as batches:
+                for batch in batches:
+                    stat["rows"] += len(batch)
+                    if not _put(q, (index, "rows", batch), stop):
+                        return
+        except Exception as e:
+            message = (index, "error", e)
+        finally:
+            stat["seconds"] = time.perf_counter() - start
+        _put(q, message, stop)
+
+    def _queues(self, make_queue):
+        if self.ordered:
+            return [make_queue(self.queue_size) for _ in self.stats]
+        return [make_queue(self.queue_size * self.partitions)] * self.partitions
+
+    def _merge(self, queues, check=None):
+        """Yield rows from the workers' queues until every partition is done."""
+        pending = self.partitions
+        current = 0
+        while pending:
+            q = queues[current] if self.ordered else queues[0]
+            try:
+                index, kind, payload = q.get(timeout=1)
+            except queue.Empty:
+                if check is not None:
+                    check()
+                continue
+            if kind == "error":
+                raise payload
+            if kind == "done":
+                if payload is not None:
+                    self.stats[index]["rows"], self.stats[index]["seconds"] = payload
+                pending -= 1
+                current += 1
+                continue
+            yield from payload
+
+    def _iter_threads(self):
+        stop = threading.Event()
+        queues = self._queues(queue.Queue)
+        shared = seed.get_pool()
+        connections = seed.ConnectionPool(self.partitions, shared.idle_timeout,
+                                          shared.checkout_timeout, shared.connect,
+                                          **shared.config)
+        pool = ThreadPoolExecutor(max_workers=self.partitions)
+        try:
+            for index in range(self.partitions):
+                pool.submit(self._scan_into, index, queues[index], stop, connections)
+            yield from self._merge(queues)
+        finally:
+            stop.set()
+            pool.shutdown(wait=True)
+            connections.close_all()
+
+    def _iter_processes(self):
+        stop = multiprocessing.Event()
+        queues = self._queues(multiprocessing.Queue)
+        workers = [
+            multiprocessing.Process(
+                target=_scan_to_queue, daemon=True,
+                args=(index, s["lo"], s["hi"], self.batch_size, queues[index], stop))
+            for index, s in enumerate(self.stats)
+        ]
+
+        def check():
+            for worker in workers:
+                if worker.exitcode not in (None, 0):
+                    raise RuntimeError(f"Partition worker exited with code {worker.exitcode}")
+
+        for worker in workers:
+            worker.start()
+        try:
+            yield from self._merge(queues, check)
+        finally:
+            stop.set()
+            for worker in workers:
+                worker.join(timeout=1)
+                if worker.is_alive():  # still blocked in the database
+                    worker.terminate()
+                    worker.join()
+
+
+def stream_users_partitioned(partitions=4, batch_size=1000, ordered=False,
+                             executor="thread"):
+    """Generator that yields every user using a PartitionedScan."""
+    yield from PartitionedScan(partitions, batch_size, ordered, executor)
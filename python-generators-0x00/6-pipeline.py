@@ -0,0 +1,181 @@
+#!/usr/bin/python3
+"""Composable, lazy streaming pipelines over the user generators"""
+import csv
+import time
+from itertools import islice
+
+from iterutils import prefetch
+
+
+class StageStats:
+    """
+    Items produced by a stage and the time spent in the stage itself.
+
+    pull_seconds is the time the consumer spent inside next() on this
+    stage, which includes pulling from every stage above it; seconds
+    subtracts the upstream stage's pull time to leave only this stage's
+    own work. Past a prefetch the upstream runs on another thread, so a
+    prefetch stage's seconds is the time its consumer waited on the buffer.
+    """
+
+    def __init__(self, name, upstream=None):
+        self.name = name
+        self.upstream = upstream
+        self.items = 0
+        self.pull_seconds = 0.0
+
+    @property
+    def seconds(self):
+        if self.upstream is None:
+            return self.pull_seconds
+        return max(self.pull_seconds - self.upstream.pull_seconds, 0.0)
+
+    @property
+    def rate(self):
+        seconds = self.seconds
+        return self.items / seconds if seconds else 0.0
+
+    def as_dict(self):
+        return {"stage": self.name, "items": self.items,
+                "seconds": round(self.seconds, 6), "items_per_s": round(self.rate, 1)}
+
+
+def _counted(iterable, stats):
+    iterator = iter(iterable)
+    clock = time.perf_counter
+    try:
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                stats.pull_seconds += clock() - start
+            stats.items += 1
+            yield item
+    finally:
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+class Pipeline:
+    """
+    Lazy chain of stages: source -> filter/map/batch/prefetch -> sink.
+
+    Every method except the sinks returns a new Pipeline; nothing runs until
+    a sink (or plain iteration) pulls rows through. Each stage counts the
+    items it emits, see stats().
+
+        Pipeline.users().filter(lambda u: u["age"] > 25).batch(1000) \\
+            .to_csv("users_over_25.csv")
+    """
+
+    def __init__(self, source, name="source", _stages=()):
+        self._source = source
+        self._source_name = name
+        self._stages = tuple(_stages)
+        self._stats = []
+
+    @classmethod
+    def users(cls, **kwargs):
+        """Source stage over stream_users(**kwargs)."""
+        stream_users = __import__('0-stream_users').stream_users
+        return cls(lambda: stream_users(**kwargs), "stream_users")
+
+    @classmethod
+    def user_batches(cls, batch_size, **kwargs):
+        """Source stage over stream_users_in_batches(batch_size, **kwargs)."""
+        batches = __import__('1-batch_processing').stream_users_in_batches
+        return cls(lambda: batches(batch_size, **kwargs), "stream_users_in_batches")
+
+    @classmethod
+    def ages(cls):
+        """Source stage over stream_user_ages()."""
+        stream_user_ages = __import__('4-stream_ages').stream_user_ages
+        return cls(stream_user_ages, "stream_user_ages")
+
+    def _then(self, name, stage, threaded=False):
+        return Pipeline(self._source, self._source_name,
+                        self._stages + ((name, stage, threaded),))
+
+    def filter(self, predicate):
+        return self._then("filter", lambda items: filter(predicate, items))
+
+    def map(self, func):
+        return self._then("map", lambda items: map(func, items))
+
+    def batch(self, size):
+        def batched(items):
+            iterator = iter(items)
+            while True:
+                chunk = list(islice(iterator, size))
+                if not chunk:
+                    return
+                yield chunk
+        return self._then("batch", batched)
+
+    def unbatch(self):
+        return self._then("unbatch", lambda batches: (i for b in batches for i in b))
+
+    def prefetch(self, size=4):
+        """
+        Run everything upstream on a background thread, keeping at most
+        size items ready; the upstream blocks when the buffer is full.
+        """
+        return self._then("prefetch", lambda items: prefetch(items, size),
+                          threaded=True)
+
+    def __iter__(self):
+        source = self._source() if callable(self._source) else self._source
+        self._stats = [StageStats(self._source_name)]
+        items = _counted(source, self._stats[0])
+        for name, stage, threaded in self._stages:
+            stats = StageStats(name, None if threaded else self._stats[-1])
+            self._stats.append(stats)
+            items = _counted(stage(items), stats)
+        return items
+
+    def stats(self):
+        """Per-stage counters of the most recent run."""
+        return [s.as_dict() for s in self._stats]
+
+    def sink(self, func):
+        """Call func on every item; returns the number of items consumed."""
+        count = 0
+        for item in self:
+            func(item)
+            count += 1
+        return count
+
+    def collect(self):
+        return list(self)
+
+    def to_csv(self, path, fieldnames=None):
+        """
+        Write dict rows, or batches of dict rows, to path; returns rows written.
+        """
+        written = 0
+        with open(path, "w", newline="") as f:
+            writer = None
+            for item in self:
+                rows = item if isinstance(item, list) else [item]
+                if not rows:
+                    continue
+                if writer is None:
+                    writer = csv.DictWriter(f, fieldnames or list(rows[0]))
+                    writer.writeheader()
+                writer.writerows(rows)
+                written += len(rows)
+        return written
+
+
+if __name__ == "__main__":
+    job = (Pipeline.users()
+           .prefetch(1000)
+           .filter(lambda user: user["age"] > 25)
+           .batch(1000))
+    print(f"Wrote {job.to_csv('users_over_25.csv')} rows")
+    for stage in job.stats():
+        print(stage)
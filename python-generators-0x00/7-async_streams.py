@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+"""Async generator counterparts of the user streaming generators"""
+import asyncio
+
+
+class MySQLDriver:
+    """aiomysql access to ALX_prodev with an unbuffered dict cursor."""
+
+    def __init__(self, **config):
+        self.config = config
+
+    async def connect(self):
+        import aiomysql
+        import seed
+        config = dict(seed.PRODEV_CONFIG, **self.config)
+        config["db"] = config.pop("database")
+        return await aiomysql.connect(**config)
+
+    async def execute(self, connection, query, params=()):
+        import aiomysql
+        cursor = await connection.cursor(aiomysql.SSDictCursor)
+        await cursor.execute(query, params)
+        return cursor
+
+    async def close(self, connection):
+        connection.close()
+
+
+class SQLiteDriver:
+    """aiosqlite access to a local user_data table, e.g. for tests."""
+
+    def __init__(self, path):
+        self.path = path
+
+    async def connect(self):
+        import aiosqlite
+        connection = await aiosqlite.connect(self.path)
+        connection.row_factory = lambda cursor, row: dict(
+            zip([column[0] for column in cursor.description], row))
+        return connection
+
+    async def execute(self, connection, query, params=()):
+        return await connection.execute(query.replace("%s", "?"), params)
+
+    async def close(self, connection):
+        await connection.close()
+
+
+async def astream_users_in_batches(batch_size, driver=None):
+    """
+    Async generator that yields batches of users.
+
+    Abandoned early, it closes only the connection: aiomysql's
+    SSDictCursor.close() reads every remaining row of the unbuffered
+    result (see seed.close_stream for the same issue on the sync side).
+    """
+    driver = driver or MySQLDriver()
+    connection = await driver.connect()
+    try:
+        cursor = await driver.execute(connection, "SELECT * FROM user_data")
+        while True:
+            rows = await cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+        await cursor.close()
+    finally:
+        await driver.close(connection)
+
+
+async def astream_users(fetch_size=1000, driver=None):
+    """Async generator that yields users one at a time."""
+    batches = astream_users_in_batches(fetch_size, driver)
+    try:
+        async for rows in batches:
+            for row in rows:
+                yield row
+    finally:
+        await batches.aclose()
+
+
+async def alazy_pagination(page_size, driver=None, after=None):
+    """
+    Async generator that yields keyset pages (user_id order) over one
+    connection, starting after user_id `after` if given.
+    """
+    driver = driver or MySQLDriver()
+    connection = await driver.connect()
+    try:
+        while True:
+            if after is None:
+                cursor = await driver.execute(
+                    connection,
+                    "SELECT * FROM user_data ORDER BY user_id LIMIT %s",
+                    (page_size,))
+            else:
+                cursor = await driver.execute(
+                    connection,
+                    "SELECT * FROM user_data WHERE user_id > %s "
+                    "ORDER BY user_id LIMIT %s", (after, page_size))
+            page = await cursor.fetchall()
+            await cursor.close()
+            if not page:
+                break
+            yield page
+            after = page[-1]["user_id"]
+    finally:
+        await driver.close(connection)
+
+
+async def main():
+    async def count(stream):
+        return sum([1 async for _ in stream])
+
+    # Several scans share one event loop.
+    users, batches, pages = await asyncio.gather(
+        count(astream_users()),
+        count(astream_users_in_batches(100)),
+        count(alazy_pagination(100)),
+    )
+    print(f"{users} users, {batches} batches, {pages} pages")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/python3
+"""
+Export user_data to Parquet or Arrow IPC files, one row group per batch.
+
+    ./8-export_columnar.py users.parquet --batch-size 50000
+    ./8-export_columnar.py users.arrow --format arrow --rows-per-file 1000000
+"""
+import argparse
+import os
+
+import pyarrow as pa
+import pyarrow.ipc
+import pyarrow.parquet as pq
+
+stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+
+SCHEMA = pa.schema([
+    ("user_id", pa.string()),
+    ("name", pa.string()),
+    ("email", pa.string()),
+    ("age", pa.decimal128(5, 2)),
+])
+
+
+def to_record_batch(rows):
+    """Convert a batch of (user_id, name, email, age) tuples."""
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, SCHEMA)],
+        schema=SCHEMA)
+
+
+class _Writer:
+    def __init__(self, path, fmt, compression):
+        if fmt == "parquet":
+            self._writer = pq.ParquetWriter(path, SCHEMA, compression=compression)
+        else:
+            self._sink = pa.OSFile(path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, SCHEMA)
+        self.fmt = fmt
+
+    def write(self, batch):
+        if self.fmt == "parquet":
+            self._writer.write_batch(batch, row_group_size=batch.num_rows)
+        else:
+            self._writer.write_batch(batch)
+
+    def close(self):
+        self._writer.close()
+        if self.fmt == "arrow":
+            self._sink.close()
+
+
+def shard_path(path, index):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}-{index:05d}{ext}"
+
+
+def export_users(path, fmt="parquet", batch_size=10000, rows_per_file=None,
+                 compression="snappy"):
+    """
+    Stream user_data into columnar files and return the paths written.
+
+    Each fetchmany batch becomes one row group (Parquet) or record batch
+    (Arrow IPC), so memory stays bounded by batch_size. With rows_per_file
+    the output is sharded into path-00000.ext, path-00001.ext, ...; a shard
+    is closed once it holds at least rows_per_file rows.
+    """
+    if fmt not in ("parquet", "arrow"):
+        raise ValueError(f"Unknown format: {fmt!r}")
+    paths, writer, rows_in_file = [], None, 0
+    try:
+        for rows in stream_users_in_batches(batch_size, row_format="tuple"):
+            if writer is None:
+                target = shard_path(path, len(paths)) if rows_per_file else path
+                writer = _Writer(target, fmt, compression)
+                paths.append(target)
+            writer.write(to_record_batch(rows))
+            rows_in_file += len(rows)
+            if rows_per_file and rows_in_file >= rows_per_file:
+                writer.close()
+                writer, rows_in_file = None, 0
+    finally:
+        if writer is not None:
+            writer.close()
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("parquet", "arrow"), default="parquet")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--rows-per-file", type=int)
+    parser.add_argument("--compression", default="snappy")
+    args = parser.parse_args()
+    for path in export_users(args.path, args.format, args.batch_size,
+                             args.rows_per_file, args.compression):
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
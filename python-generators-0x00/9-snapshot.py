@@ -0,0 +1,230 @@
+#!/usr/bin/python3
+"""
+Memory-mapped local snapshot of user_data for repeat scans.
+
+File layout (little endian), every section contiguous:
+
+    header   magic, generation, row_count, source row count, source update time
+    ids      row_count x 16-byte UUIDs
+    index    row_count x (name offset, name length, email offset, email length)
+    ages     row_count x float64
+    heap     UTF-8 names and emails referenced by the index
+"""
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import uuid
+
+import mysql.connector
+
+import seed
+
+stream_users_in_batches = __import__('1-batch_processing').stream_users_in_batches
+
+MAGIC = b"USNAP001"
+HEADER = struct.Struct("<8sQQQd")
+INDEX = struct.Struct("<QIQI")
+ID_SIZE = 16
+AGE = struct.Struct("<d")
+
+
+def source_fingerprint(connection=None):
+    """
+    (row count, last update time) of user_data as seen by the database.
+
+    MySQL 8 serves information_schema.TABLES.UPDATE_TIME from a cache
+    refreshed every information_schema_stats_expiry seconds (a day by
+    default), so an UPDATE that keeps the row count would go unnoticed;
+    the session setting is zeroed for the query to read it live. InnoDB
+    does not persist UPDATE_TIME: it is NULL (reported as 0.0) after a
+    server restart until the next write, so a snapshot built before the
+    restart is rebuilt once, never served stale.
+    """
+    own = connection is None
+    connection = connection or seed.connect_to_prodev()
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        (count,) = cursor.fetchone()
+        try:
+            cursor.execute("SET SESSION information_schema_stats_expiry = 0")
+            live = True
+        except mysql.connector.Error:  # MySQL 5.7 / MariaDB: no cache to bypass
+            live = False
+        cursor.execute(
+            "SELECT UNIX_TIMESTAMP(UPDATE_TIME) FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_data'")
+        row = cursor.fetchone()
+        if live:  # pooled connection: leave the next borrower the default
+            cursor.execute("SET SESSION information_schema_stats_expiry = DEFAULT")
+    finally:
+        cursor.close()
+        if own:
+            connection.close()
+    updated = float(row[0]) if row and row[0] is not None else 0.0
+    return int(count), updated
+
+
+def _read_generation(path):
+    try:
+        with open(path, "rb") as f:
+            magic, generation, *_ = HEADER.unpack(f.read(HEADER.size))
+    except (OSError, struct.error):
+        return 0
+    return generation if magic == MAGIC else 0
+
+
+def build_snapshot(path, batch_size=10000):
+    """
+    Dump user_data into path and return the opened Snapshot.
+
+    Sections are spooled to temporary files while streaming, then
+    concatenated and atomically moved into place. The generation number
+    is one more than that of the snapshot being replaced.
+    """
+    fingerprint = source_fingerprint()
+    generation = _read_generation(path) + 1
+    directory = os.path.dirname(os.path.abspath(path))
+    sections = [tempfile.TemporaryFile(dir=directory) for _ in range(4)]
+    ids, index, ages, heap = sections
+    heap_size = row_count = 0
+    try:
+        for rows in stream_users_in_batches(batch_size, row_format="tuple"):
+            for user_id, name, email, age in rows:
+                name_bytes, email_bytes = name.encode(), email.encode()
+                ids.write(uuid.UUID(user_id).bytes)
+                index.write(INDEX.pack(heap_size, len(name_bytes),
+                                       heap_size + len(name_bytes), len(email_bytes)))
+                ages.write(AGE.pack(float(age)))
+                heap.write(name_bytes)
+                heap.write(email_bytes)
+                heap_size += len(name_bytes) + len(email_bytes)
+            row_count += len(rows)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, "wb") as out:
+            out.write(HEADER.pack(MAGIC, generation, row_count, *fingerprint))
+            for section in sections:
+                section.seek(0)
+                shutil.copyfileobj(section, out)
+        os.replace(tmp_path, path)
+    finally:
+        for section in sections:
+            section.close()
+    return Snapshot(path)
+
+
+class Snapshot:
+    """
+    Zero-copy, read-only view of a snapshot file built by build_snapshot.
+
+    ages() hands out memoryviews over the mapping itself, and the mapping
+    cannot be unmapped while any of them is alive: release them (or use
+    them as context managers) before close(), or copy them with bytes() /
+    array.array("d", ...) if they must outlive the snapshot. close() raises
+    BufferError while a view is still held and leaves the snapshot open.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.generation, self.row_count, count, updated = \
+            HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a user_data snapshot")
+        self.fingerprint = (count, updated)
+        self._map_sections()
+
+    def _map_sections(self):
+        view = memoryview(self._mmap)
+        n = self.row_count
+        offset = HEADER.size
+        self._ids = view[offset:offset + n * ID_SIZE]
+        offset += n * ID_SIZE
+        self._index = view[offset:offset + n * INDEX.size]
+        offset += n * INDEX.size
+        self._ages = view[offset:offset + n * AGE.size]
+        offset += n * AGE.size
+        self._heap = view[offset:]
+
+    def is_stale(self, connection=None):
+        """True if user_data changed since this snapshot was taken."""
+        return source_fingerprint(connection) != self.fingerprint
+
+    def ages(self):
+        """
+        All ages as a float64 memoryview straight from the page cache.
+        Release it (with ages: ... or ages.release()) before close().
+        """
+        return self._ages.cast("d")
+
+    def stream_user_ages(self):
+        with self.ages() as ages:
+            yield from ages
+
+    def _user(self, i):
+        name_off, name_len, email_off, email_len = INDEX.unpack_from(
+            self._index, i * INDEX.size)
+        return (
+            str(uuid.UUID(bytes=bytes(self._ids[i * ID_SIZE:(i + 1) * ID_SIZE]))),
+            str(self._heap[name_off:name_off + name_len], "utf-8"),
+            str(self._heap[email_off:email_off + email_len], "utf-8"),
+            AGE.unpack_from(self._ages, i * AGE.size)[0],
+        )
+
+    def stream_users_in_batches(self, batch_size, row_format="dict"):
+        """Same batches as stream_users_in_batches, read from the snapshot."""
+        for start in range(0, self.row_count, batch_size):
+            rows = [self._user(i)
+                    for i in range(start, min(start + batch_size, self.row_count))]
+            if row_format == "dict":
+                rows = [dict(zip(("user_id", "name", "email", "age"), row))
+                        for row in rows]
+            yield seed.convert_rows(rows, row_format)
+
+    def batch_processing(self, batch_size):
+        """batch_processing (users over 25) against the snapshot."""
+        with self.ages() as ages:
+            for start in range(0, self.row_count, batch_size):
+                for i in range(start, min(start + batch_size, self.row_count)):
+                    if int(ages[i]) > 25:
+                        yield dict(zip(("user_id", "name", "email", "age"),
+                                       self._user(i)))
+
+    def close(self):
+        if self._mmap.closed:
+            return
+        for view in (self._ids, self._index, self._ages, self._heap):
+            view.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            self._map_sections()  # still open: keep the snapshot usable
+            raise BufferError(
+                f"{self.path}: release the views returned by ages() "
+                "before closing the snapshot") from None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def open_snapshot(path, batch_size=10000):
+    """Open path, rebuilding it first if missing or stale."""
+    if os.path.exists(path):
+        snapshot = Snapshot(path)
+        if not snapshot.is_stale():
+            return snapshot
+        snapshot.close()
+    return build_snapshot(path, batch_size)
+
+
+if __name__ == "__main__":
+    with open_snapshot("user_data.snap") as snapshot, snapshot.ages() as ages:
+        print(f"generation {snapshot.generation}: {snapshot.row_count} users, "
+              f"average age {sum(ages) / max(len(ages), 1):.2f}")
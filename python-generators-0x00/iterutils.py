@@ -0,0 +1,56 @@
+#!/usr/bin/python3
+"""Iteration helpers shared by the generator modules"""
+import queue
+import threading
+
+_DONE = object()
+
+
+def prefetch(iterable, size):
+    """
+    Iterate iterable on a background thread, keeping up to size items ready.
+
+    The producer blocks when the buffer is full, exceptions are re-raised in
+    the consumer, and abandoning the returned generator stops the producer
+    and closes iterable on its own thread.
+    """
+    buffer = queue.Queue(maxsize=size)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def fill():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if not put((True, item)):
+                    break
+            else:
+                put((True, _DONE))
+        except BaseException as e:
+            put((False, e))
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+
+    worker = threading.Thread(target=fill, daemon=True)
+    worker.start()
+    try:
+        while True:
+            ok, item = buffer.get()
+            if not ok:
+                raise item
+            if item is _DONE:
+                return
+            yield item
+    finally:
+        stop.set()
+        worker.join()
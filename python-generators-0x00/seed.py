@@ -1,6 +1,111 @@
 import mysql.connector
 import csv
+import hashlib
+import operator
+import os
+import random
+import threading
+import time
 import uuid
+import weakref
+from itertools import islice
+
+ROW_FORMATS = ("dict", "tuple", "slots")
+USER_COLUMNS = ("user_id", "name", "email", "age")
+# Operators build_select accepts, with their Python equivalents
+SQL_OPERATORS = {
+    ">": operator.gt, ">=": operator.ge, "<": operator.lt,
+    "<=": operator.le, "=": operator.eq, "!=": operator.ne,
+}
+
+
+class UserRow:
+    """Compact user_data row: fixed attributes, no per-row dict."""
+    __slots__ = ("user_id", "name", "email", "age")
+
+    def __init__(self, user_id, name, email, age):
+        self.user_id = user_id
+        self.name = name
+        self.email = email
+        self.age = age
+
+    def __iter__(self):
+        return iter((self.user_id, self.name, self.email, self.age))
+
+    def __eq__(self, other):
+        return isinstance(other, UserRow) and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return (f"UserRow(user_id={self.user_id!r}, name={self.name!r}, "
+                f"email={self.email!r}, age={self.age!r})")
+
+
+def row_cursor(connection, row_format="dict", **kwargs):
+    """Cursor for SELECT * FROM user_data returning rows in row_format."""
+    if row_format not in ROW_FORMATS:
+        raise ValueError(f"row_format must be one of {ROW_FORMATS}, got {row_format!r}")
+    return connection.cursor(dictionary=row_format == "dict", **kwargs)
+
+
+def convert_rows(rows, row_format):
+    """Wrap rows fetched by row_cursor into UserRow objects if requested."""
+    if row_format == "slots":
+        return [UserRow(*row) for row in rows]
+    return rows
+
+
+def close_stream(cursor, connection):
+    """
+    Close a streaming cursor and hand its connection back.
+
+    If the consumer stopped early the server is still sending rows, and
+    mysql.connector's cursor.close() raises InternalError("Unread result
+    found") rather than skip them; the cursor is left alone instead and
+    the pool discards the connection, which is cheaper than draining it.
+    """
+    try:
+        if not getattr(connection, "unread_result", False):
+            cursor.close()
+    finally:
+        connection.close()
+
+
+def user_id_of(row):
+    """user_id of a row in any of the ROW_FORMATS."""
+    if isinstance(row, dict):
+        return row["user_id"]
+    if isinstance(row, UserRow):
+        return row.user_id
+    return row[0]
+
+
+def build_select(columns=None, where=None, row_format="dict"):
+    """
+    Compile a projection and predicates into a parameterized user_data query.
+
+    where is one (column, op, value) triple or a list of them (ANDed);
+    column names and operators are checked against USER_COLUMNS and
+    SQL_OPERATORS, values are always passed as parameters. Returns
+    (sql, params).
+    """
+    columns = tuple(columns or USER_COLUMNS)
+    if row_format == "slots" and columns != USER_COLUMNS:
+        raise ValueError('row_format="slots" needs every user_data column')
+    predicates = [where] if where and isinstance(where[0], str) else list(where or ())
+    for name in columns + tuple(p[0] for p in predicates):
+        if name not in USER_COLUMNS:
+            raise ValueError(f"Unknown user_data column: {name!r}")
+    clauses, params = [], []
+    for name, op, value in predicates:
+        if op not in SQL_OPERATORS:
+            raise ValueError(f"Unsupported operator: {op!r}")
+        clauses.append(f"{name} {op} %s")
+        params.append(value)
+    sql = f"SELECT {', '.join(columns)} FROM user_data"
+    if clauses:
+        sql += " WHERE " + " AND ".join(clauses)
+    return sql, params
+
 
 def connect_db():
     return mysql.connector.connect(
@@ -14,15 +119,192 @@ def create_database(connection):
     cursor.execute("CREATE DATABASE IF NOT EXISTS ALX_prodev")
     cursor.close()
 
+PRODEV_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "yourpassword",
+    "database": "ALX_prodev",
+}
+
+
+class PooledConnection:
+    """
+    Connection borrowed from a ConnectionPool.
+
+    Behaves like the underlying connection, except that close() hands it
+    back to the pool instead of closing the socket. A proxy dropped without
+    close(), e.g. by a generator its consumer abandoned, is closed for real
+    when garbage collected, so its pool slot is not lost.
+    """
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+        self._finalizer = weakref.finalize(self, pool.discard, connection)
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            raise mysql.connector.errors.OperationalError(
+                "Connection was returned to the pool")
+        return getattr(self._connection, name)
+
+    def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._finalizer.detach()
+            self._pool.release(connection)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of at most `size` MySQL connections.
+
+    Idle connections are health-checked (ping) on checkout and closed once
+    they have been idle for more than idle_timeout seconds. acquire() waits
+    up to checkout_timeout seconds when every connection is in use. New
+    connections are opened with connect(**config), mysql.connector.connect
+    by default.
+    """
+
+    def __init__(self, size=5, idle_timeout=300, checkout_timeout=30,
+                 connect=None, **config):
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.connect = connect or mysql.connector.connect
+        self.config = config or PRODEV_CONFIG
+        self._idle = []  # (connection, released_at), most recent last
+        self._open = 0
+        self._cond = threading.Condition()
+        self.pid = os.getpid()
+
+    def _evict_idle(self, now):
+        keep = []
+        for connection, released_at in self._idle:
+            if now - released_at > self.idle_timeout:
+                self._discard(connection)
+            else:
+                keep.append((connection, released_at))
+        self._idle = keep
+
+    def _discard(self, connection):
+        self._open -= 1
+        try:
+            connection.close()
+        except mysql.connector.Error:
+            pass
+
+    @staticmethod
+    def _healthy(connection):
+        try:
+            connection.ping(reconnect=False)
+            return True
+        except mysql.connector.Error:
+            return False
+
+    def discard(self, connection):
+        """Close a checked-out connection and free its slot."""
+        with self._cond:
+            self._discard(connection)
+            self._cond.notify()
+
+    def acquire(self):
+        deadline = time.monotonic() + self.checkout_timeout
+        while True:
+            with self._cond:
+                while True:
+                    self._evict_idle(time.monotonic())
+                    if self._idle:
+                        connection, _ = self._idle.pop()
+                        break
+                    if self._open < self.size:
+                        self._open += 1
+                        connection = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0 or not self._cond.wait(remaining):
+                        raise mysql.connector.errors.PoolError(
+                            f"No connection available within {self.checkout_timeout}s")
+            if connection is None:
+                break
+            # Ping outside the lock so checkouts don't queue behind a round trip.
+            if self._healthy(connection):
+                return PooledConnection(self, connection)
+            self.discard(connection)
+        try:
+            return PooledConnection(self, self.connect(**self.config))
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, connection):
+        with self._cond:
+            if getattr(connection, "unread_result", False):
+                # Abandoned stream: rollback() would read every remaining row.
+                self._discard(connection)
+                self._cond.notify()
+                return
+            try:
+                connection.rollback()  # never hand out an open transaction
+            except mysql.connector.Error:
+                self._discard(connection)
+            else:
+                self._idle.append((connection, time.monotonic()))
+            self._cond.notify()
+
+    def close_all(self):
+        with self._cond:
+            for connection, _ in self._idle:
+                self._discard(connection)
+            self._idle = []
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure_pool(size=5, idle_timeout=300, checkout_timeout=30,
+                   connect=None, **config):
+    """Replace the pool behind connect_to_prodev()."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close_all()
+        _pool = ConnectionPool(size, idle_timeout, checkout_timeout,
+                               connect, **config)
+    return _pool
+
+
+def get_pool():
+    """The pool behind connect_to_prodev() in this process."""
+    global _pool
+    pool = _pool
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+            elif _pool.pid != os.getpid():
+                # Forked child: never reuse the parent's sockets.
+                _pool = ConnectionPool(_pool.size, _pool.idle_timeout,
+                                       _pool.checkout_timeout, _pool.connect,
+                                       **_pool.config)
+            pool = _pool
+    return pool
+
+
 def connect_to_prodev():
-    return mysql.connector.connect(
-        host="localhost",
-        user="root",
-        password="yourpassword",
-        database="ALX_prodev"
-    )
+    """Borrow a connection to ALX_prodev; close() returns it to the pool."""
+    return get_pool().acquire()
 
-def create_table(connection):
+def create_table(connection, age_index=False):
     cursor = connection.cursor()
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS user_data (
@@ -35,6 +317,24 @@ def create_table(connection):
     connection.commit()
     print("Table user_data created successfully")
     cursor.close()
+    if age_index:
+        create_age_index(connection)
+
+
+def create_age_index(connection):
+    """
+    Index user_data(age). InnoDB secondary indexes carry the primary key,
+    so age filters projecting only (user_id, age) are covering index scans.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("CREATE INDEX idx_user_data_age ON user_data (age)")
+    except mysql.connector.Error as e:
+        if e.errno != 1061:  # ER_DUP_KEYNAME: index already exists
+            raise
+    finally:
+        cursor.close()
+    connection.commit()
 
 def insert_data(connection, csv_file):
     cursor = connection.cursor()
@@ -47,3 +347,168 @@ def insert_data(connection, csv_file):
             """, (str(uuid.uuid4()), row['name'], row['email'], row['age']))
     connection.commit()
     cursor.close()
+
+
+def _read_checkpoint(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path) as f:
+        return int(f.read().strip() or 0)
+
+
+def _write_checkpoint(path, rows_done):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(str(rows_done))
+    os.replace(tmp, path)
+
+
+def insert_data_bulk(connection, csv_file, chunk_size=1000, checkpoint_file=None):
+    """
+    Stream csv_file into user_data in chunks of chunk_size rows.
+
+    Each chunk is sent with a single executemany (which mysql.connector
+    rewrites into one multi-row INSERT) and committed on its own, so no
+    transaction grows beyond chunk_size rows. The number of committed rows
+    is recorded in checkpoint_file (default: "<csv_file>.checkpoint");
+    re-running after an interruption skips the rows already committed.
+    The checkpoint is written after the commit, so a crash in between
+    replays that chunk: user_id is derived from the email (user_id_for)
+    so the replayed rows are dropped by INSERT IGNORE instead of being
+    inserted twice. Returns the number of rows sent by this run.
+    """
+    checkpoint_file = checkpoint_file or csv_file + ".checkpoint"
+    rows_done = _read_checkpoint(checkpoint_file)
+    if rows_done:
+        print(f"Resuming after {rows_done} committed rows")
+
+    cursor = connection.cursor()
+    inserted = 0
+    start = time.perf_counter()
+    with open(csv_file, newline='') as f:
+        reader = islice(csv.DictReader(f), rows_done, None)
+        while True:
+            chunk = [
+                (user_id_for(row['email']), row['name'], row['email'], row['age'])
+                for row in islice(reader, chunk_size)
+            ]
+            if not chunk:
+                break
+            cursor.executemany("""
+                INSERT IGNORE INTO user_data (user_id, name, email, age)
+                VALUES (%s, %s, %s, %s)
+            """, chunk)
+            connection.commit()
+            inserted += len(chunk)
+            rows_done += len(chunk)
+            _write_checkpoint(checkpoint_file, rows_done)
+    cursor.close()
+
+    elapsed = time.perf_counter() - start
+    rate = inserted / elapsed if elapsed > 0 else 0.0
+    print(f"Inserted {inserted} rows in {elapsed:.2f}s ({rate:,.0f} rows/s)")
+    if os.path.exists(checkpoint_file):
+        os.remove(checkpoint_file)
+    return inserted
+
+
+def insert_synthetic_data(connection, total_rows, chunk_size=10000):
+    """Fill user_data with total_rows generated users, chunk_size per commit."""
+    cursor = connection.cursor()
+    rng = random.Random(total_rows)
+    remaining = total_rows
+    while remaining > 0:
+        n = min(chunk_size, remaining)
+        chunk = []
+        for _ in range(n):
+            user_id = str(uuid.UUID(int=rng.getrandbits(128), version=4))
+            chunk.append((user_id, f"User {user_id[:8]}",
+                          f"{user_id[:8]}@example.com", rng.randint(1, 120)))
+        cursor.executemany("""
+            INSERT IGNORE INTO user_data (user_id, name, email, age)
+            VALUES (%s, %s, %s, %s)
+        """, chunk)
+        connection.commit()
+        remaining -= n
+    cursor.close()
+
+
+USER_NAMESPACE = uuid.UUID("6f2b3c9e-5d1a-4b8e-9c47-0a1e2d3f4b5c")
+
+
+def user_id_for(email):
+    """Deterministic user_id: UUIDv5 of the normalised email."""
+    return str(uuid.uuid5(USER_NAMESPACE, email.strip().lower()))
+
+
+def row_hash(name, email, age):
+    return hashlib.sha1(f"{name}\x1f{email}\x1f{age}".encode()).hexdigest()
+
+
+def create_hash_table(connection):
+    """Side table holding the content hash of every seeded user_data row."""
+    cursor = connection.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_data_hashes (
+            user_id CHAR(36) PRIMARY KEY,
+            row_hash CHAR(40) NOT NULL
+        )
+    """)
+    connection.commit()
+    cursor.close()
+
+
+def _existing_hashes(cursor, user_ids):
+    placeholders = ", ".join(["%s"] * len(user_ids))
+    cursor.execute(
+        f"SELECT user_id, row_hash FROM user_data_hashes "
+        f"WHERE user_id IN ({placeholders})", list(user_ids))
+    return dict(cursor.fetchall())
+
+
+def insert_data_idempotent(connection, csv_file, chunk_size=1000):
+    """
+    Seed user_data so that re-running with the same CSV is a no-op.
+
+    user_id is derived from the email (user_id_for), and each row's
+    content hash is kept in user_data_hashes. Every chunk's hashes are
+    looked up with one indexed IN query, and only new or changed rows are
+    upserted, so a reseed costs work proportional to what changed.
+    Returns {"upserted": n, "unchanged": m}.
+    """
+    create_hash_table(connection)
+    cursor = connection.cursor()
+    upserted = unchanged = 0
+    with open(csv_file, newline='') as f:
+        reader = csv.DictReader(f)
+        while True:
+            chunk = {}
+            for row in islice(reader, chunk_size):
+                user_id = user_id_for(row['email'])
+                chunk[user_id] = (row['name'], row['email'], row['age'],
+                                  row_hash(row['name'], row['email'], row['age']))
+            if not chunk:
+                break
+
+            existing = _existing_hashes(cursor, chunk)
+            changed = [(user_id, *values) for user_id, values in chunk.items()
+                       if existing.get(user_id) != values[3]]
+            unchanged += len(chunk) - len(changed)
+            if not changed:
+                continue
+
+            cursor.executemany("""
+                INSERT INTO user_data (user_id, name, email, age)
+                VALUES (%s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    name = VALUES(name), email = VALUES(email), age = VALUES(age)
+            """, [row[:4] for row in changed])
+            cursor.executemany("""
+                INSERT INTO user_data_hashes (user_id, row_hash)
+                VALUES (%s, %s)
+                ON DUPLICATE KEY UPDATE row_hash = VALUES(row_hash)
+            """, [(row[0], row[4]) for row in changed])
+            connection.commit()
+            upserted += len(changed)
+    cursor.close()
+    return {"upserted": upserted, "unchanged": unchanged}
@@ -0,0 +1,64 @@
+#!/usr/bin/python3
+"""
+Per-row filtering (the batch_processing loop) vs the columnar path that
+batch_processing_columnar ships (filter_batches), on synthetic in-memory
+batches of the tuples a cursor returns, ages as DECIMAL(5,2) values.
+
+Both sides start from tuples and end with a dict per surviving row, so
+the comparison covers the whole path either function runs per batch.
+
+    ./tests/bench_batch_filter.py --sizes 100 1000 10000 100000
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+import uuid
+from decimal import Decimal
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+processing = __import__('1-batch_processing')
+
+
+def make_rows(n):
+    rng = random.Random(n)
+    return [(str(uuid.uuid4()), "Name", "name@example.com",
+             Decimal(rng.randint(100, 12000)) / 100)
+            for _ in range(n)]
+
+
+def per_row(tuple_rows):
+    users = (dict(zip(processing.seed.USER_COLUMNS, row)) for row in tuple_rows)
+    return [user for user in users if user["age"] >= 26]
+
+
+def columnar(tuple_rows):
+    return list(processing.filter_batches([tuple_rows], ("age", ">=", 26)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[100, 1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    backend = "numpy" if processing.np is not None else "per-row fallback"
+    print(f"columnar backend: {backend}")
+    print(f"{'batch':>8} {'per-row ms':>11} {'columnar ms':>12} {'speedup':>8}")
+    for size in args.sizes:
+        tuple_rows = make_rows(size)
+        assert per_row(tuple_rows) == columnar(tuple_rows)
+        number = max(1, 100_000 // size)
+        t_row = min(timeit.repeat(lambda: per_row(tuple_rows),
+                                  number=number, repeat=args.repeat)) / number
+        t_col = min(timeit.repeat(lambda: columnar(tuple_rows),
+                                  number=number, repeat=args.repeat)) / number
+        print(f"{size:>8} {t_row * 1e3:>11.3f} {t_col * 1e3:>12.3f} "
+              f"{t_row / t_col:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
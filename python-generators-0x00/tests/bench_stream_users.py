@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+"""
+Peak RSS of stream_users as user_data grows.
+
+For each table size the table is topped up with synthetic users, then
+stream_users is drained in a fresh child process whose peak RSS is read
+back from getrusage. With a bounded fetch_size the numbers should stay
+flat from 10k to 10M rows.
+
+    ./tests/bench_stream_users.py --sizes 10000 100000 1000000 10000000
+"""
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+seed = __import__('seed')
+
+
+def drain(fetch_size):
+    stream_users = __import__('0-stream_users').stream_users
+    start = time.perf_counter()
+    count = sum(1 for _ in stream_users(fetch_size))
+    elapsed = time.perf_counter() - start
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"{count} {elapsed:.3f} {peak_kb}")
+
+
+def table_size(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM user_data")
+    (count,) = cursor.fetchone()
+    cursor.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--fetch-size", type=int, default=1000)
+    parser.add_argument("--drain", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.drain:
+        drain(args.fetch_size)
+        return
+
+    connection = seed.connect_to_prodev()
+    seed.create_table(connection)
+    print(f"{'rows':>10} {'seconds':>9} {'rows/s':>12} {'peak RSS MB':>12}")
+    for size in sorted(args.sizes):
+        missing = size - table_size(connection)
+        if missing > 0:
+            seed.insert_synthetic_data(connection, missing)
+        out = subprocess.run(
+            [sys.executable, __file__, "--drain",
+             "--fetch-size", str(args.fetch_size)],
+            check=True, capture_output=True, text=True,
+        ).stdout.split()
+        count, elapsed, peak_kb = int(out[0]), float(out[1]), int(out[2])
+        rate = count / elapsed if elapsed else 0.0
+        print(f"{count:>10} {elapsed:>9.2f} {rate:>12,.0f} {peak_kb / 1024:>12.1f}")
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
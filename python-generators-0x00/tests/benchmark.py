@@ -0,0 +1,177 @@
+#!/usr/bin/python3
+"""
+Benchmark the user generators against a synthetic user_data table.
+
+Times stream_users, stream_users_in_batches, lazy_pagination and
+compute_average_age for rows/s, time to first row and peak Python memory
+(tracemalloc), and writes the results as JSON so runs on different
+commits can be compared.
+
+    ./tests/benchmark.py --rows 100000 --output HEAD.json
+    ./tests/benchmark.py --rows 100000 --compare HEAD.json
+    ./tests/benchmark.py --backend mysql --rows 1000000
+    ./tests/benchmark.py --rows 1000000 --age-index --compare no_index.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+seed = __import__('seed')
+
+
+def _count(items):
+    """Drain items and return (count, seconds to the first item)."""
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for item in items:
+        if first is None:
+            first = time.perf_counter() - start
+        count += len(item) if isinstance(item, list) else 1
+    return count, first
+
+
+def _average_age():
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        __import__('4-stream_ages').compute_average_age()
+    return None, time.perf_counter() - start
+
+
+def _filter_in_python(batches, batch_size):
+    return (user for batch in batches(batch_size)
+            for user in batch if int(user["age"]) > 25)
+
+
+def workloads(batch_size):
+    stream_users = __import__('0-stream_users').stream_users
+    batches = __import__('1-batch_processing').stream_users_in_batches
+    batch_processing = __import__('1-batch_processing').batch_processing
+    lazy_pagination = __import__('2-lazy_paginate').lazy_pagination
+    return {
+        "stream_users": lambda: _count(stream_users()),
+        "stream_users_in_batches": lambda: _count(batches(batch_size)),
+        "lazy_pagination": lambda: _count(lazy_pagination(batch_size)),
+        "lazy_pagination_keyset": lambda: _count(
+            lazy_pagination(batch_size, keyset=True)),
+        "compute_average_age": _average_age,
+        "age_filter_python": lambda: _count(_filter_in_python(batches, batch_size)),
+        "age_filter_sql": lambda: _count(batch_processing(batch_size)),
+        "age_filter_sql_covering": lambda: _count(
+            batch_processing(batch_size, columns=("user_id", "age"))),
+    }
+
+
+def run(workload, table_rows, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows, ttfr = workload()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best[0]:
+            best = (elapsed, rows, ttfr)
+    elapsed, rows, ttfr = best
+
+    tracemalloc.start()
+    workload()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    rows = table_rows if rows is None else rows
+    return {
+        "rows": rows,
+        "seconds": round(elapsed, 6),
+        "rows_per_s": round(rows / elapsed, 1) if elapsed else None,
+        "time_to_first_row_s": round(ttfr, 6) if ttfr is not None else None,
+        "peak_memory_bytes": peak,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare(backend, rows, database, age_index):
+    if backend == "sqlite":
+        standin = __import__('sqlite_standin')
+        seed.configure_pool(connect=standin.connect, database=database)
+    connection = seed.connect_to_prodev()
+    seed.create_table(connection, age_index)
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*) FROM user_data")
+    (existing,) = cursor.fetchone()
+    cursor.close()
+    if existing > rows:
+        raise SystemExit(f"user_data already holds {existing} rows (> {rows})")
+    seed.insert_synthetic_data(connection, rows - existing)
+    connection.close()
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} ({baseline.get('commit')}):")
+    for name, result in results["results"].items():
+        before = baseline["results"].get(name)
+        if not before or not before["rows_per_s"] or not result["rows_per_s"]:
+            continue
+        ratio = result["rows_per_s"] / before["rows_per_s"]
+        print(f"  {name:<24} {ratio:6.2f}x rows/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--backend", choices=("sqlite", "mysql"), default="sqlite")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--database", help="SQLite file (default: temporary)")
+    parser.add_argument("--age-index", action="store_true",
+                        help="create INDEX(age) before running")
+    parser.add_argument("--output", help="write JSON results here")
+    parser.add_argument("--compare", help="JSON results of a previous run")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = args.database or os.path.join(tmp, "user_data.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            prepare(args.backend, args.rows, database, args.age_index)
+        results = {
+            "commit": git_commit(),
+            "backend": args.backend,
+            "table_rows": args.rows,
+            "batch_size": args.batch_size,
+            "age_index": args.age_index,
+            "python": platform.python_version(),
+            "results": {
+                name: run(workload, args.rows, args.repeat)
+                for name, workload in workloads(args.batch_size).items()
+            },
+        }
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+"""
+SQLite stand-in for the slice of mysql.connector the generators use.
+
+    seed.configure_pool(connect=sqlite_standin.connect, database="bench.db")
+
+%s placeholders become ?, INSERT IGNORE becomes INSERT OR IGNORE, VAR_POP
+is registered as an aggregate and sqlite3 errors are re-raised as
+mysql.connector errors, so seed and the generator modules run unchanged.
+"""
+import sqlite3
+
+import mysql.connector
+
+
+class _VarPop:
+    def __init__(self):
+        self.n, self.mean, self.m2 = 0, 0.0, 0.0
+
+    def step(self, value):
+        if value is None:
+            return
+        self.n += 1
+        delta = value - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (value - self.mean)
+
+    def finalize(self):
+        return self.m2 / self.n if self.n else None
+
+
+def _translate(query):
+    return query.replace("%s", "?").replace("INSERT IGNORE", "INSERT OR IGNORE")
+
+
+class StandInCursor:
+    def __init__(self, connection, dictionary=False, buffered=None):
+        self._cursor = connection.cursor()
+        self._dictionary = dictionary
+
+    def _call(self, method, *args):
+        try:
+            return method(*args)
+        except sqlite3.Error as e:
+            # Report "index ... already exists" as MySQL's ER_DUP_KEYNAME.
+            errno = 1061 if "already exists" in str(e) else None
+            raise mysql.connector.errors.DatabaseError(msg=str(e), errno=errno) from e
+
+    def execute(self, query, params=()):
+        self._call(self._cursor.execute, _translate(query), tuple(params))
+
+    def executemany(self, query, seq_params):
+        self._call(self._cursor.executemany, _translate(query), seq_params)
+
+    def _convert(self, rows):
+        if not self._dictionary:
+            return rows
+        names = [column[0] for column in self._cursor.description]
+        return [dict(zip(names, row)) for row in rows]
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return row if row is None else self._convert([row])[0]
+
+    def fetchmany(self, size=1):
+        return self._convert(self._cursor.fetchmany(size))
+
+    def fetchall(self):
+        return self._convert(self._cursor.fetchall())
+
+    def __iter__(self):
+        while True:
+            rows = self.fetchmany(1000)
+            if not rows:
+                return
+            yield from rows
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandInConnection:
+    def __init__(self, database):
+        self._connection = sqlite3.connect(database, check_same_thread=False)
+        self._connection.create_aggregate("VAR_POP", 1, _VarPop)
+
+    def cursor(self, dictionary=False, buffered=None):
+        return StandInCursor(self._connection, dictionary, buffered)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def ping(self, reconnect=False):
+        try:
+            self._connection.execute("SELECT 1")
+        except sqlite3.Error as e:
+            raise mysql.connector.errors.InterfaceError(msg=str(e)) from e
+
+    def close(self):
+        self._connection.close()
+
+
+def connect(database="ALX_prodev.db", **_):
+    """mysql.connector.connect look-alike; host/user/password are ignored."""
+    return StandInConnection(database)
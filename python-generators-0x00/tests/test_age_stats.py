@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+"""Tests for 4-stream_ages: t-digest accuracy and the streaming fallback"""
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+try:
+    import seed
+    import sqlite_standin
+    stream_ages = __import__('4-stream_ages')
+except ImportError:  # mysql.connector is not installed
+    seed = None
+
+
+@unittest.skipIf(seed is None, "mysql.connector is not installed")
+class TestTDigest(unittest.TestCase):
+    """Quantile estimates stay close to the exact ranks"""
+
+    def test_quantiles_within_one_percent_of_rank(self):
+        rng = random.Random(42)
+        values = [rng.uniform(0, 120) for _ in range(20000)]
+        digest = stream_ages.TDigest()
+        for value in values:
+            digest.add(value)
+        ordered = sorted(values)
+        for q in (0.01, 0.25, 0.5, 0.9, 0.99):
+            estimate = digest.quantile(q)
+            rank = sum(1 for value in ordered if value <= estimate) / len(ordered)
+            self.assertAlmostEqual(rank, q, delta=0.01, msg=f"q={q}")
+        self.assertLess(len(digest._centroids), 2 * digest.compression)
+
+    def test_empty_and_single_value(self):
+        digest = stream_ages.TDigest()
+        self.assertIsNone(digest.quantile(0.5))
+        digest.add(42.0)
+        self.assertEqual(digest.quantile(0.99), 42.0)
+
+
+@unittest.skipIf(seed is None, "mysql.connector is not installed")
+class TestAgeStats(unittest.TestCase):
+    """Pushed-down and streamed statistics agree"""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        rng = random.Random(7)
+        self.ages = [rng.randint(1, 12000) / 100 for _ in range(2000)]
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE user_data (user_id CHAR(36) PRIMARY KEY, "
+                         "name TEXT, email TEXT, age REAL)")
+            conn.executemany("INSERT INTO user_data VALUES (?, 'n', 'e', ?)",
+                             [(f"{i:036d}", age) for i, age in enumerate(self.ages)])
+        seed.configure_pool(connect=sqlite_standin.connect, database=self.path)
+        self.addCleanup(seed.configure_pool)
+
+    def check(self, stats):
+        self.assertEqual(stats["count"], len(self.ages))
+        self.assertAlmostEqual(stats["mean"], statistics.fmean(self.ages), places=6)
+        self.assertAlmostEqual(stats["variance"], statistics.pvariance(self.ages), places=4)
+        self.assertEqual((stats["min"], stats["max"]), (min(self.ages), max(self.ages)))
+        median = statistics.median(self.ages)
+        self.assertAlmostEqual(stats["percentiles"][50], median, delta=2)
+
+    def test_pushdown(self):
+        self.check(stream_ages.age_stats(percentiles=(50,)))
+
+    def test_fallback_when_aggregate_query_fails(self):
+        error = seed.mysql.connector.errors.DatabaseError("VAR_POP unsupported")
+        with mock.patch.object(stream_ages, "_sql_age_stats", side_effect=error):
+            self.check(stream_ages.age_stats(percentiles=(50,)))
+
+
+if __name__ == "__main__":
+    unittest.main()
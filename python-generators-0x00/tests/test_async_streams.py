@@ -0,0 +1,139 @@
+#!/usr/bin/python3
+"""Tests for 7-async_streams against a local SQLite stand-in"""
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+async_streams = __import__('7-async_streams')
+
+try:
+    import aiosqlite  # noqa: F401
+except ImportError:
+    aiosqlite = None
+
+USERS = [(f"{i:08x}-0000-4000-8000-000000000000", f"User {i}",
+          f"user{i}@example.com", 20 + i % 50) for i in range(250)]
+
+
+class SpyCursor:
+    """Cursor wrapper that records whether close() was called."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.closed = False
+
+    async def fetchmany(self, size):
+        return await self.cursor.fetchmany(size)
+
+    async def close(self):
+        self.closed = True
+        await self.cursor.close()
+
+
+class SpyDriver(async_streams.SQLiteDriver):
+    """SQLiteDriver that records the connections and cursors it handles."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.opened = []
+        self.closed = []
+        self.cursors = []
+
+    async def connect(self):
+        connection = await super().connect()
+        self.opened.append(connection)
+        return connection
+
+    async def execute(self, connection, query, params=()):
+        self.cursors.append(SpyCursor(await super().execute(connection, query, params)))
+        return self.cursors[-1]
+
+    async def close(self, connection):
+        await super().close(connection)
+        self.closed.append(connection)
+
+
+@unittest.skipIf(aiosqlite is None, "aiosqlite is not installed")
+class TestAsyncStreams(unittest.IsolatedAsyncioTestCase):
+    """Async generators read user_data through SQLiteDriver"""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE user_data (user_id CHAR(36) PRIMARY KEY, "
+                         "name TEXT, email TEXT, age REAL)")
+            conn.executemany("INSERT INTO user_data VALUES (?, ?, ?, ?)", USERS)
+        self.driver = async_streams.SQLiteDriver(self.path)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    async def test_astream_users(self):
+        """astream_users yields every row as a dict"""
+        rows = [row async for row in async_streams.astream_users(64, self.driver)]
+        self.assertEqual(len(rows), len(USERS))
+        self.assertEqual(set(rows[0]), {"user_id", "name", "email", "age"})
+
+    async def test_astream_users_in_batches(self):
+        """Batches are bounded by batch_size and cover the table"""
+        sizes = [len(batch) async for batch in
+                 async_streams.astream_users_in_batches(100, self.driver)]
+        self.assertEqual(sizes, [100, 100, 50])
+
+    async def test_alazy_pagination_resumes(self):
+        """Keyset pages are ordered and resume after a given user_id"""
+        pages = [page async for page in
+                 async_streams.alazy_pagination(100, self.driver)]
+        ids = [row["user_id"] for page in pages for row in page]
+        self.assertEqual(ids, sorted(u[0] for u in USERS))
+
+        resumed = [page async for page in async_streams.alazy_pagination(
+            100, self.driver, after=pages[0][-1]["user_id"])]
+        self.assertEqual(resumed, pages[1:])
+
+    async def test_scans_share_one_loop(self):
+        """Concurrent scans interleave on a single event loop"""
+        async def count(stream):
+            return sum([1 async for _ in stream])
+
+        results = await asyncio.gather(
+            count(async_streams.astream_users(10, self.driver)),
+            count(async_streams.astream_users_in_batches(10, self.driver)),
+            count(async_streams.alazy_pagination(10, self.driver)),
+        )
+        self.assertEqual(results, [250, 25, 25])
+
+    async def test_early_exit_closes_connection(self):
+        """Abandoning a stream early still closes its connection"""
+        driver = SpyDriver(self.path)
+        stream = async_streams.astream_users(10, driver)
+        first = await stream.__anext__()
+        self.assertIn("user_id", first)
+        self.assertEqual(driver.closed, [])
+        await stream.aclose()
+        self.assertEqual(driver.closed, driver.opened)
+        self.assertEqual(len(driver.opened), 1)
+
+    async def test_unfinished_stream_is_not_drained(self):
+        """An abandoned cursor is dropped with its connection, not closed"""
+        driver = SpyDriver(self.path)
+        stream = async_streams.astream_users_in_batches(10, driver)
+        await stream.__anext__()
+        await stream.aclose()
+        self.assertFalse(driver.cursors[0].closed)
+        self.assertEqual(driver.closed, driver.opened)
+
+        finished = SpyDriver(self.path)
+        async for _ in async_streams.astream_users_in_batches(100, finished):
+            pass
+        self.assertTrue(finished.cursors[0].closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+#!/usr/bin/python3
+"""Tests for 1-batch_processing's columnar filter"""
+import os
+import sys
+import unittest
+from decimal import Decimal
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+try:
+    processing = __import__('1-batch_processing')
+except ImportError:  # mysql.connector is not installed
+    processing = None
+
+ROWS = [(f"id-{age}", "Name", "name@example.com", Decimal(age))
+        for age in ("25.00", "25.50", "25.70", "26.00", "40.25")]
+
+
+def ages(rows):
+    return [str(row["age"]) for row in rows]
+
+
+@unittest.skipIf(processing is None, "mysql.connector is not installed")
+class TestFilterBatches(unittest.TestCase):
+    """filter_batches compares exact values, with or without NumPy"""
+
+    def check(self):
+        self.assertEqual(ages(processing.filter_batches([ROWS], ("age", ">=", 25.5))),
+                         ["25.50", "25.70", "26.00", "40.25"])
+        self.assertEqual(ages(processing.filter_batches([ROWS], ("age", "<", 25.5))),
+                         ["25.00"])
+        self.assertEqual(ages(processing.filter_batches([ROWS])),
+                         ["26.00", "40.25"])
+
+    @unittest.skipIf(processing is None or processing.np is None, "NumPy is not installed")
+    def test_numpy_mask(self):
+        self.check()
+
+    def test_per_row_fallback(self):
+        with mock.patch.object(processing, "np", None):
+            self.check()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+"""Tests for seed.insert_data_bulk resuming against the SQLite stand-in"""
+import io
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+try:
+    import seed
+    import sqlite_standin
+except ImportError:  # mysql.connector is not installed
+    seed = None
+
+
+@unittest.skipIf(seed is None, "mysql.connector is not installed")
+class TestInsertDataBulk(unittest.TestCase):
+    """A crash between commit and checkpoint does not duplicate users"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.csv = os.path.join(directory.name, "user_data.csv")
+        with open(self.csv, "w") as f:
+            f.write("name,email,age\n")
+            for i in range(25):
+                f.write(f"User {i},user{i}@example.com,{20 + i}\n")
+        self.connection = sqlite_standin.connect(os.path.join(directory.name, "db"))
+        self.addCleanup(self.connection.close)
+        cursor = self.connection.cursor()
+        cursor.execute("CREATE TABLE user_data (user_id CHAR(36) PRIMARY KEY, "
+                       "name TEXT, email TEXT, age REAL)")
+
+    def count(self):
+        cursor = self.connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM user_data")
+        return cursor.fetchone()[0]
+
+    def test_replayed_chunk_is_ignored(self):
+        with redirect_stdout(io.StringIO()):
+            with mock.patch.object(seed, "_write_checkpoint", side_effect=OSError):
+                with self.assertRaises(OSError):
+                    seed.insert_data_bulk(self.connection, self.csv, chunk_size=10)
+            self.assertEqual(self.count(), 10)  # committed, not checkpointed
+            seed.insert_data_bulk(self.connection, self.csv, chunk_size=10)
+        self.assertEqual(self.count(), 25)
+        self.assertFalse(os.path.exists(self.csv + ".checkpoint"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+"""Tests for 5-partitioned_scan against the SQLite stand-in"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+try:
+    import seed
+    import sqlite_standin
+    partitioned_scan = __import__('5-partitioned_scan')
+except ImportError:  # mysql.connector is not installed
+    seed = None
+
+USERS = [(f"{i * 16 ** 8 // 400:08x}-0000-4000-8000-000000000000", f"User {i}",
+          f"user{i}@example.com", 20 + i % 50) for i in range(400)]
+
+
+@unittest.skipIf(seed is None, "mysql.connector is not installed")
+class TestPartitionedScan(unittest.TestCase):
+    """Partitions hold a connection each for the whole scan"""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE user_data (user_id CHAR(36) PRIMARY KEY, "
+                         "name TEXT, email TEXT, age REAL)")
+            conn.executemany("INSERT INTO user_data VALUES (?, ?, ?, ?)", USERS)
+        self.shared = seed.configure_pool(size=2, checkout_timeout=0.2,
+                                          connect=sqlite_standin.connect,
+                                          database=self.path)
+        self.addCleanup(seed.configure_pool)
+
+    def test_more_partitions_than_pool_slots(self):
+        """A slow consumer doesn't time out partitions beyond pool.size"""
+        scan = partitioned_scan.PartitionedScan(partitions=8, batch_size=10,
+                                                queue_size=1)
+        rows = []
+        for row in scan:
+            if not rows:
+                time.sleep(0.5)  # longer than the shared checkout_timeout
+            rows.append(row)
+        self.assertEqual(sorted(row["user_id"] for row in rows),
+                         [user[0] for user in USERS])
+        self.assertEqual(self.shared._open, 0)
+
+    def test_abandoned_scan_closes_its_connections(self):
+        """Closing the stream early stops every partition"""
+        scan = partitioned_scan.PartitionedScan(partitions=8, batch_size=10,
+                                                queue_size=1)
+        stream = iter(scan)
+        next(stream)
+        stream.close()
+        self.assertTrue(all(stat["seconds"] is not None for stat in scan.stats))
+
+    def test_process_executor_streams_batches(self):
+        """Process workers stream every row and report their stats"""
+        scan = partitioned_scan.PartitionedScan(partitions=4, batch_size=10,
+                                                ordered=True, executor="process")
+        rows = [row["user_id"] for row in scan]
+        self.assertEqual(rows, [user[0] for user in USERS])
+        self.assertEqual(sum(stat["rows"] for stat in scan.stats), len(USERS))
+
+    def test_abandoned_process_scan_returns_promptly(self):
+        """Closing a process scan early doesn't wait for the partitions"""
+        scan = partitioned_scan.PartitionedScan(partitions=4, batch_size=1,
+                                                queue_size=1, executor="process")
+        stream = iter(scan)
+        next(stream)
+        started = time.monotonic()
+        stream.close()
+        self.assertLess(time.monotonic() - started, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+"""Tests for seed.ConnectionPool slot accounting"""
+import gc
+import os
+import sys
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+try:
+    import seed
+except ImportError:  # mysql.connector is not installed
+    seed = None
+
+
+class FakeConnection:
+    """Just enough of a mysql.connector connection for the pool."""
+
+    def __init__(self):
+        self.closed = False
+        self.unread_result = False
+
+    def ping(self, reconnect=False):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@unittest.skipIf(seed is None, "mysql.connector is not installed")
+class TestConnectionPool(unittest.TestCase):
+    """Borrowed connections always find their way back to a free slot"""
+
+    def setUp(self):
+        self.opened = []
+
+        def connect(**config):
+            self.opened.append(FakeConnection())
+            return self.opened[-1]
+
+        self.pool = seed.ConnectionPool(size=2, checkout_timeout=0.2,
+                                        connect=connect, database="test")
+
+    def test_dropped_connection_frees_its_slot(self):
+        """A proxy garbage collected without close() is discarded"""
+        for _ in range(3):
+            self.pool.acquire()
+            gc.collect()
+        connection = self.pool.acquire()
+        self.assertEqual(self.pool._open, 1)
+        self.assertTrue(all(c.closed for c in self.opened[:-1]))
+        connection.close()
+
+    def test_closed_connection_is_reused(self):
+        """close() returns the connection to the idle list"""
+        self.pool.acquire().close()
+        self.pool.acquire().close()
+        self.assertEqual(len(self.opened), 1)
+
+    def test_unread_result_is_discarded_not_drained(self):
+        """Connections returned mid-stream are closed, not rolled back"""
+        connection = self.pool.acquire()
+        self.opened[0].unread_result = True
+        seed.close_stream(cursor=None, connection=connection)
+        self.assertTrue(self.opened[0].closed)
+        self.assertEqual((self.pool._open, self.pool._idle), (0, []))
+
+    def test_exhausted_pool_times_out(self):
+        """acquire() raises PoolError when every slot stays checked out"""
+        held = [self.pool.acquire(), self.pool.acquire()]
+        with self.assertRaises(seed.mysql.connector.errors.PoolError):
+            self.pool.acquire()
+        for connection in held:
+            connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/python3
+"""Tests for iterutils.prefetch and prefetched batch streams"""
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+from iterutils import prefetch  # noqa: E402
+
+try:
+    import seed
+    import sqlite_standin
+    processing = __import__('1-batch_processing')
+except ImportError:  # mysql.connector is not installed
+    seed = None
+
+USERS = [(f"{i:08x}-0000-4000-8000-000000000000", f"User {i}",
+          f"user{i}@example.com", 20 + i % 50) for i in range(100)]
+
+
+class TestPrefetch(unittest.TestCase):
+    """The producer thread is transparent to the consumer"""
+
+    def test_items_arrive_in_order(self):
+        self.assertEqual(list(prefetch(range(50), 3)), list(range(50)))
+
+    def test_producer_error_reaches_consumer(self):
+        def produce():
+            yield 1
+            raise ValueError("lost connection")
+
+        stream = prefetch(produce(), 2)
+        self.assertEqual(next(stream), 1)
+        with self.assertRaisesRegex(ValueError, "lost connection"):
+            next(stream)
+
+
+@unittest.skipIf(seed is None, "mysql.connector is not installed")
+class TestPrefetchedBatches(unittest.TestCase):
+    """Prefetched batch streams give their pool slot back"""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self.pool = seed.configure_pool(size=1, checkout_timeout=0.2,
+                                        connect=sqlite_standin.connect,
+                                        database=self.path)
+        self.addCleanup(seed.configure_pool)
+
+    def create_table(self):
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("CREATE TABLE user_data (user_id CHAR(36) PRIMARY KEY, "
+                         "name TEXT, email TEXT, age REAL)")
+            conn.executemany("INSERT INTO user_data VALUES (?, ?, ?, ?)", USERS)
+
+    def test_close_after_one_batch_releases_the_slot(self):
+        self.create_table()
+        stream = processing.stream_users_in_batches(10, prefetch=2)
+        self.assertEqual(len(next(stream)), 10)
+        stream.close()
+        connection = seed.connect_to_prodev()  # times out if the slot leaked
+        connection.close()
+
+    def test_database_error_reaches_consumer(self):
+        stream = processing.stream_users_in_batches(10, prefetch=2)  # no table
+        with self.assertRaises(seed.mysql.connector.Error):
+            next(stream)
+        connection = seed.connect_to_prodev()
+        connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()